@@ -1168,6 +1168,11 @@ async def main():
         print(performance_calculator.format_report(metrics))
         
         account.print_status()
+    finally:
+        # Cerrar las sesiones HTTP persistentes en cualquier salida (Ctrl+C bajo asyncio.run
+        # llega como cancelación de la tarea, no como KeyboardInterrupt)
+        await telegram_bot.aclose()
+        await scanner.aclose()
 
 
 if __name__ == "__main__":
@@ -100,7 +100,8 @@ ZIGZAG_CONFIGS = {
 }
 
 # Pares excluidos del escaneo
-EXCLUDED_PAIRS = [
+# frozenset: membership O(1) al filtrar cientos de tickers por escaneo
+EXCLUDED_PAIRS = frozenset([
     "USDCUSDT",
     "TUSDUSDT", 
     "BUSDUSDT",
@@ -112,7 +113,7 @@ EXCLUDED_PAIRS = [
     "GBPUSDT",
     "OMNIUSDT",
     "PONKEUSDT"
-]
+])
 
 # Archivos
 TRADES_FILE = os.getenv("BOT_TRADES_FILE", "trades.json")
@@ -6,9 +6,15 @@ from typing import List, Dict, Optional
 from dataclasses import dataclass
 import json
 import os
+import logging
 
 from config import ZIGZAG_CONFIGS, FIBONACCI_LEVELS
 
+# Logger para el detalle de swings. Hijo del logger de sesión ('bot_session' de logger.py):
+# importar este módulo no crea ningún archivo de log; cuando el bot configuró la sesión,
+# los registros se propagan a su archivo, y si no (p. ej. web_server.py solo) se descartan.
+fibonacci_logger = logging.getLogger("bot_session.fibonacci")
+
 # Cargar configuración de trading desde shared_config.json
 _config_path = os.path.join(os.path.dirname(__file__), "shared_config.json")
 _shared_config = {}
@@ -25,7 +31,7 @@ CASE_4_MAX = _trading.get("case_4_max", 0.90)
 # Niveles de invalidación eliminados - se usa CASE_4_MAX
 
 
-@dataclass
+@dataclass(slots=True)
 class ZigZagPoint:
     index: int
     time: int
@@ -65,6 +71,7 @@ def calculate_zigzag(candle_data: List[dict], timeframe: str = "1h") -> List[Zig
     # ===== FASE 1: Encontrar TODOS los pivotes potenciales =====
     # Usamos una ventana más flexible
     potential_pivots = []
+    pivot_keys = set()  # (index, type) para verificar existencia en O(1)
     
     for i in range(depth, len(data) - 1):  # Hasta la penúltima vela
         is_high = True
@@ -85,12 +92,14 @@ def calculate_zigzag(candle_data: List[dict], timeframe: str = "1h") -> List[Zig
                 "price": data[i]["high"],
                 "type": "high"
             })
+            pivot_keys.add((i, "high"))
         if is_low:
             potential_pivots.append({
                 "index": i,
                 "price": data[i]["low"],
                 "type": "low"
             })
+            pivot_keys.add((i, "low"))
     
     # También agregar extremos de las últimas velas
     last_n = min(depth, len(data) - 1)
@@ -100,13 +109,13 @@ def calculate_zigzag(candle_data: List[dict], timeframe: str = "1h") -> List[Zig
         min_idx = len(data) - last_n + min(range(len(last_section)), key=lambda x: last_section[x]["low"])
         
         # Solo añadir si no existen ya
-        if not any(p["index"] == max_idx and p["type"] == "high" for p in potential_pivots):
+        if (max_idx, "high") not in pivot_keys:
             potential_pivots.append({
                 "index": max_idx,
                 "price": data[max_idx]["high"],
                 "type": "high"
             })
-        if not any(p["index"] == min_idx and p["type"] == "low" for p in potential_pivots):
+        if (min_idx, "low") not in pivot_keys:
             potential_pivots.append({
                 "index": min_idx,
                 "price": data[min_idx]["low"],
@@ -239,28 +248,25 @@ def find_valid_fibonacci_swing(
     
     working_high_points = high_points.copy()
     if skip_first_high and len(working_high_points) > 1:
-        print(f"   ⚠️ Último punto ZigZag es HIGH ({last_zigzag.price:.4f}) - Ignorando")
+        fibonacci_logger.debug("   ⚠️ Último punto ZigZag es HIGH (%.4f) - Ignorando", last_zigzag.price)
         working_high_points = working_high_points[1:]
     
     valid_swings = []
     found_path1_case1 = False  # Para saber si ya encontramos un Caso 1 en Path 1
     
+    # Columnas extraídas una sola vez (búsquedas con min()/max() en C en lugar de loops Python)
+    lows = [c["low"] for c in candle_data]
+    highs = [c["high"] for c in candle_data]
+    
     # ===== CAMINO 1: Buscar swing normal =====
     for high_idx, current_high in enumerate(working_high_points):
         if current_high.index >= last_candle_index:
             continue
         
-        # Buscar el Low real
-        lowest_price = float('inf')
-        lowest_index = current_high.index + 1
-        
-        for k in range(current_high.index + 1, last_candle_index + 1):
-            if candle_data[k]["low"] < lowest_price:
-                lowest_price = candle_data[k]["low"]
-                lowest_index = k
-        
-        if lowest_price == float('inf'):
-            continue
+        # Buscar el Low real (primer mínimo tras el High)
+        search_start = current_high.index + 1
+        lowest_price = min(lows[search_start:])
+        lowest_index = lows.index(lowest_price, search_start)
         
         lowest_low = ZigZagPoint(
             index=lowest_index,
@@ -286,26 +292,17 @@ def find_valid_fibonacci_swing(
         fib_limit_c3 = lowest_low.price + (range_val * limit_high_c3)
         fib_90_level = lowest_low.price + (range_val * CASE_4_MAX)
         
-        # CHECK 90% (CASE_4_MAX) - INVALIDACIÓN TOTAL
-        invalidated_by_90 = False
-        for k in range(lowest_low.index + 1, last_candle_index + 1):
-            if candle_data[k]["high"] >= fib_90_level:
-                invalidated_by_90 = True
-                print(f"   ⛔ {CASE_4_MAX*100:.1f}% TOUCHED - INVALIDATING SWING, moving to next High...")
-                break
+        # Máximo alcanzado después del Low: una sola reducción sirve para los tres niveles
+        max_high_after_low = max(highs[lowest_low.index + 1:], default=float('-inf'))
         
-        if invalidated_by_90:
+        # CHECK 90% (CASE_4_MAX) - INVALIDACIÓN TOTAL
+        if max_high_after_low >= fib_90_level:
+            fibonacci_logger.debug("   ⛔ %.1f%% TOUCHED - INVALIDATING SWING, moving to next High...", CASE_4_MAX * 100)
             continue  # Intentar siguiente High
         
         # CHECK niveles intermedios
-        has_touched_618 = False # Tocó 61.8% -> Adios C1
-        has_touched_786 = False # Tocó 78.6% -> Adios C3
-        
-        for k in range(lowest_low.index + 1, last_candle_index + 1):
-            if candle_data[k]["high"] >= fib_limit_c3:
-                has_touched_786 = True
-            if candle_data[k]["high"] >= fib_limit_c1:
-                has_touched_618 = True
+        has_touched_618 = max_high_after_low >= fib_limit_c1  # Tocó 61.8% -> Adios C1
+        has_touched_786 = max_high_after_low >= fib_limit_c3  # Tocó 78.6% -> Adios C3
         
         # Determinar min_valid_case
         # - Si tocó 78.6% → Solo Caso 4 válido (min_valid_case = 4)
@@ -313,10 +310,10 @@ def find_valid_fibonacci_swing(
         min_valid_case = 1
         if has_touched_786:
             min_valid_case = 4
-            print(f"   ⚠️ 78.6% TOUCHED - Only Case 4 valid (Path 1)")
+            fibonacci_logger.debug("   ⚠️ 78.6% TOUCHED - Only Case 4 valid (Path 1)")
         elif has_touched_618:
             min_valid_case = 3
-            print(f"   ⚠️ 61.8% TOUCHED - Cases 3,4 valid (Path 1)")
+            fibonacci_logger.debug("   ⚠️ 61.8% TOUCHED - Cases 3,4 valid (Path 1)")
         
         # Verificar si el precio actual está en zona válida para Path 1
         # Verificar si el precio actual está en zona válida para Path 1
@@ -328,11 +325,13 @@ def find_valid_fibonacci_swing(
         # - min_valid_case = 3: precio debe estar >= 67%   (zona C3+)
         # - min_valid_case = 4: precio debe estar >= 79%   (zona C4)
         if min_valid_case == 3 and current_price < level_case1_max_3_min:
-            print(f"   ⚠️ Casos 3-4 válidos pero precio ({current_price:.4f}) debajo de zona C3 ({level_case1_max_3_min:.4f}) - buscando siguiente High...")
+            fibonacci_logger.debug("   ⚠️ Casos 3-4 válidos pero precio (%.4f) debajo de zona C3 (%.4f) - buscando siguiente High...",
+                                   current_price, level_case1_max_3_min)
             continue
         
         if min_valid_case == 4 and current_price < level_case3_max_4_min:
-            print(f"   ⚠️ Solo Caso 4 válido pero precio ({current_price:.4f}) debajo de zona C4 ({level_case3_max_4_min:.4f}) - buscando siguiente High...")
+            fibonacci_logger.debug("   ⚠️ Solo Caso 4 válido pero precio (%.4f) debajo de zona C4 (%.4f) - buscando siguiente High...",
+                                   current_price, level_case3_max_4_min)
             continue
         
         levels = calculate_fibonacci_levels(current_high.price, lowest_low.price)
@@ -347,9 +346,9 @@ def find_valid_fibonacci_swing(
             path=1
         )
         
-        case_text = f"Cases {min_valid_case}-4" if min_valid_case > 1 else "All Cases"
-        print(f"   ✅ Swing válido (Path 1): High {current_high.price:.4f} -> Low {lowest_low.price:.4f}")
-        print(f"      Valid entries: {case_text}")
+        fibonacci_logger.debug("   ✅ Swing válido (Path 1): High %.4f -> Low %.4f | Valid entries: %s",
+                               current_high.price, lowest_low.price,
+                               f"Cases {min_valid_case}-4" if min_valid_case > 1 else "All Cases")
         
         valid_swings.append(swing_path1)
         
@@ -364,7 +363,7 @@ def find_valid_fibonacci_swing(
     if valid_swings:
         return valid_swings
     
-    print("   ⚠️ No se encontró swing válido tras revisar todos los Highs")
+    fibonacci_logger.debug("   ⚠️ No se encontró swing válido tras revisar todos los Highs")
     return None
 
 
@@ -422,7 +421,7 @@ def determine_trading_case(current_price: float, swing: FibonacciSwing,
     
     # VALIDAR contra min_valid_case del swing
     if detected_case > 0 and detected_case < swing.min_valid_case:
-        print(f"   ⚠️ Case {detected_case} detected but invalidated (min valid = Case {swing.min_valid_case})")
+        fibonacci_logger.debug("   ⚠️ Case %d detected but invalidated (min valid = Case %d)", detected_case, swing.min_valid_case)
         return 0
     
     # ===== VALIDACIÓN: Verificar que el nivel de ENTRADA no haya sido tocado =====
@@ -457,8 +456,8 @@ def determine_trading_case(current_price: float, swing: FibonacciSwing,
             for i in range(start_idx, len(candle_data)):
                 candle_high = candle_data[i]["high"]
                 if candle_high >= entry_level:
-                    print(f"   ⛔ Case {detected_case} INVALIDATED: Entry level already touched by wick (candle {i})")
-                    print(f"      Entry: {entry_level:.6f}, Candle high: {candle_high:.6f}")
+                    fibonacci_logger.debug("   ⛔ Case %d INVALIDATED: Entry level already touched by wick (candle %d) | Entry: %.6f, Candle high: %.6f",
+                                           detected_case, i, entry_level, candle_high)
                     return 0  # El nivel ya fue tocado, no poner orden
     
     return detected_case
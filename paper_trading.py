@@ -285,6 +285,14 @@ class PaperTradingAccount:
             }
             with open(self.trades_file, 'w') as f:
                 json.dump(data, f, indent=2, default=str)
+            
+            # Resumen sin historial para lectores que solo necesitan el estado (telegram_multibot)
+            state = {k: data[k] for k in ("balance", "initial_balance", "open_positions", "pending_orders", "last_updated")}
+            # Escritura atómica: el lector nunca ve un archivo a medio escribir
+            state_file = os.path.splitext(self.trades_file)[0] + ".state.json"
+            with open(state_file + ".tmp", 'w') as f:
+                json.dump(state, f, default=str)
+            os.replace(state_file + ".tmp", state_file)
         except Exception as e:
             print(f"⚠️ Error guardando trades: {e}")
     
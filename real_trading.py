@@ -327,6 +327,14 @@ class RealTradingAccount:
             }
             with open(self.trades_file, 'w') as f:
                 json.dump(data, f, indent=2, default=str)
+            
+            # History-free summary for readers that only need current state (telegram_multibot)
+            state = {k: data[k] for k in ("balance", "open_positions", "pending_orders")}
+            # Atomic write: readers never see a half-written file
+            state_file = os.path.splitext(self.trades_file)[0] + ".state.json"
+            with open(state_file + ".tmp", 'w') as f:
+                json.dump(state, f, default=str)
+            os.replace(state_file + ".tmp", state_file)
         except Exception as e:
             logger.error(f"Failed to save trades: {e}")
     
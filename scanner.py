@@ -5,26 +5,78 @@ Implementa sistema de 2 caminos para detección de swing Fibonacci
 """
 import json
 import os
+import time
+import heapq
 import asyncio
 import aiohttp
 from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass
 
-from config import REST_BASE_URL, MARGIN_PER_TRADE, MAX_MARGIN_PER_TRADE, TARGET_PROFIT, LEVERAGE, COMMISSION_RATE, MIN_AVAILABLE_MARGIN, TIMEFRAME, CANDLE_LIMIT, RSI_TIMEFRAME
+try:
+    import orjson  # Opcional: parseo JSON 3-5x más rápido (acepta bytes sin decodificar a str)
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+from config import REST_BASE_URL, MARGIN_PER_TRADE, MAX_MARGIN_PER_TRADE, TARGET_PROFIT, LEVERAGE, COMMISSION_RATE, MIN_AVAILABLE_MARGIN, TIMEFRAME, CANDLE_LIMIT, RSI_TIMEFRAME, RSI_THRESHOLD, EXCLUDED_PAIRS
 from fibonacci import calculate_zigzag, find_valid_fibonacci_swing, determine_trading_case
+from paper_trading import OrderSide
 from logger import setup_logger
 
 # Logger para el scanner
 scanner_logger = setup_logger("scanner")
 
-# Cargar límite de operaciones simultáneas desde config
-def get_max_simultaneous_operations() -> int:
+# Convertir intervalo a formato Bybit (1, 3, 5, 15, 30, 60, 120, 240, 360, 720, D, M, W)
+_INTERVAL_MAP = {
+    '1m': '1', '3m': '3', '5m': '5', '15m': '15', '30m': '30',
+    '1h': '60', '2h': '120', '4h': '240', '6h': '360', '12h': '720',
+    '1d': 'D', '1w': 'W', '1M': 'M'
+}
+_KLINE_URL = f"{REST_BASE_URL}/v5/market/kline"
+
+# Rate limit REST de Bybit (límite público: 600 req / 5s por IP) con margen de seguridad
+BYBIT_REST_RATE = 100  # requests/segundo sostenidos
+BYBIT_REST_BURST = 30  # ráfaga máxima
+
+# TTL (segundos) de los caches en memoria de velas y último precio
+KLINE_CACHE_TTL = 5
+TICKER_CACHE_TTL = 1
+# Tope de entradas por cache: al superarlo se purgan las expiradas (y si no basta, las más antiguas)
+CACHE_MAX_ENTRIES = 512
+
+# Niveles Fibonacci expuestos en ScanResult: (clave, clave en swing.levels, ratio de respaldo o None = 0)
+_RESULT_FIB_LEVELS = (
+    ('40', '40', 0.40),
+    ('45', '45', 0.45),
+    ('50', '50', None),
+    ('55', '55', 0.55),
+    ('60', '60', 0.60),
+    ('62', '62', 0.62),
+    ('618', '61.8', None),
+    ('69', '69', 0.69),
+    ('70', '70', 0.70),
+    ('75', '75', None),
+    ('786', '78.6', None),
+)
+
+# shared_config.json cacheado: solo se vuelve a parsear si cambió su mtime
+_shared_config_cache = {'mtime': 0, 'data': {}}
+
+def _load_shared_config() -> dict:
+    """Obtener shared_config.json (re-lee el archivo solo si fue modificado)"""
     try:
-        with open('shared_config.json', 'r') as f:
-            config = json.load(f)
-            return config.get('trading', {}).get('max_simultaneous_operations', 20)
+        mtime = os.stat('shared_config.json').st_mtime
+        if mtime != _shared_config_cache['mtime']:
+            with open('shared_config.json', 'r') as f:
+                _shared_config_cache['data'] = json.load(f)
+            _shared_config_cache['mtime'] = mtime
     except:
-        return 20  # Valor por defecto
+        pass  # Mantener último contenido válido conocido
+    return _shared_config_cache['data']
+
+# Cargar límite de operaciones simultáneas desde config
+def get_max_simultaneous_operations() -> int:
+    return _load_shared_config().get('trading', {}).get('max_simultaneous_operations', 20)
 
 # Cargar configuración de TP/SL por estrategia
 def get_strategy_config() -> dict:
@@ -45,15 +97,85 @@ def get_strategy_config() -> dict:
         "c3": {"tp": 0.51, "sl": 1.05},
         "c4": {"tp": 0.56, "sl": 1.05}
     }
-    try:
-        with open('shared_config.json', 'r') as f:
-            config = json.load(f)
-            return config.get('strategies', defaults)
-    except:
-        return defaults
+    return _load_shared_config().get('strategies', defaults)
 
 
-@dataclass
+def _cache_put(cache: dict, key, value, now: float, ttl: float):
+    """Guardar (now, value) en un cache TTL acotado a CACHE_MAX_ENTRIES"""
+    cache.pop(key, None)
+    if len(cache) >= CACHE_MAX_ENTRIES:
+        for old_key in [k for k, (ts, _) in cache.items() if now - ts >= ttl]:
+            del cache[old_key]
+        # Todo vigente: descartar las más antiguas (dict mantiene orden de inserción)
+        while len(cache) >= CACHE_MAX_ENTRIES:
+            del cache[next(iter(cache))]
+    cache[key] = (now, value)
+
+
+def _wilder_rsi(closes: List[float], period: int) -> float:
+    """
+    RSI con suavizado de Wilder sobre una lista de cierres (len > period).
+    Función pura a nivel de módulo: el loop secuencial trabaja solo con floats locales.
+    """
+    deltas = [b - a for a, b in zip(closes, closes[1:])]
+    
+    # Semilla: media simple de ganancias y pérdidas del primer periodo
+    seed = deltas[:period]
+    avg_gain = sum(d for d in seed if d > 0) / period
+    avg_loss = -sum(d for d in seed if d < 0) / period
+    
+    # Suavizado de Wilder en una sola pasada (sin listas intermedias de gains/losses)
+    keep = period - 1
+    for d in deltas[period:]:
+        if d > 0:
+            avg_gain = (avg_gain * keep + d) / period
+            avg_loss = (avg_loss * keep) / period
+        else:
+            avg_gain = (avg_gain * keep) / period
+            avg_loss = (avg_loss * keep - d) / period
+    
+    if avg_loss == 0:
+        return 100.0
+    
+    rs = avg_gain / avg_loss
+    return 100 - (100 / (1 + rs))
+
+
+class _TokenBucket:
+    """Token bucket: `rate` requests/s sostenidos con ráfagas de hasta `burst`"""
+    
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.last = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        """Esperar hasta disponer de un token (los tokens se recargan de forma continua)"""
+        async with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self.last = time.monotonic()
+                self.tokens = 0.0
+            else:
+                self.tokens -= 1
+
+
+def get_active_symbols(account) -> set:
+    """Símbolos con posición abierta u orden pendiente (órdenes Real = dict, Paper = objeto)"""
+    active = {pos.symbol for pos in account.open_positions.values()}
+    active.update(
+        (order.get('symbol') if isinstance(order, dict) else order.symbol)
+        for order in account.pending_orders.values()
+    )
+    return active
+
+
+@dataclass(slots=True)
 class ScanResult:
     symbol: str
     rsi: float
@@ -66,175 +188,229 @@ class ScanResult:
 
 class MarketScanner:
     def __init__(self, top_n: int = 100):
-        from config import RSI_THRESHOLD
         self.top_n = top_n
         self.rsi_period = 14
         self.rsi_threshold = RSI_THRESHOLD  # Leer de config.py
         self.rsi_timeframe = RSI_TIMEFRAME  # Leer de config.py
         self.pairs_cache: List[str] = []
         self.last_scan_results: Dict[str, ScanResult] = {}
+        self.last_rsi: Dict[str, Tuple[float, float]] = {}  # (timestamp monotónico, RSI) del ciclo anterior
+        # ZigZag por símbolo: (clave de velas, puntos) - evita recalcular si las velas no cambiaron
+        self._zigzag_cache: Dict[str, tuple] = {}
+        # Sesión HTTP compartida (pool de conexiones + keep-alive entre escaneos)
+        self._http: Optional[aiohttp.ClientSession] = None
+        # Caches TTL en memoria: velas (symbol, interval, limit) -> (ts, filas) y último precio por símbolo
+        self._kline_cache: Dict[tuple, Tuple[float, list]] = {}
+        self._ticker_cache: Dict[str, Tuple[float, float]] = {}
+        # Límite de requests de velas en vuelo (reemplaza la pausa fija entre lotes)
+        self._rate = asyncio.Semaphore(30)
+        # Límite de tasa sostenida para todos los requests REST a Bybit
+        self._bucket = _TokenBucket(rate=BYBIT_REST_RATE, burst=BYBIT_REST_BURST)
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Sesión aiohttp única del scanner (se crea al primer uso y se recrea si se cerró)"""
+        if self._http is None or self._http.closed:
+            self._http = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=200, limit_per_host=50, ttl_dns_cache=300, keepalive_timeout=75),
+                timeout=aiohttp.ClientTimeout(total=10)
+            )
+        return self._http
+    
+    async def aclose(self):
+        """Cerrar la sesión HTTP compartida (llamar al apagar el bot)"""
+        if self._http is not None and not self._http.closed:
+            await self._http.close()
+        self._http = None
     
     async def get_top_pairs(self) -> List[str]:
         """Obtener top N pares por volumen de Bybit Futures"""
-        from config import EXCLUDED_PAIRS # Importar aquí para evitar ciclo si no está arriba
         url = f"{REST_BASE_URL}/v5/market/tickers?category=linear"
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status != 200:
-                        print(f"❌ Error obteniendo pares: {response.status}")
-                        return self.pairs_cache or []
-                    
-                    data = await response.json()
-                    
-                    if data.get('retCode') != 0:
-                        print(f"❌ Error API Bybit: {data.get('retMsg')}")
-                        return self.pairs_cache or []
-                    
-                    tickers = data.get('result', {}).get('list', [])
-                    
-                    # Filtrar y ordenar por volumen
-                    usdt_pairs = [
-                        item for item in tickers 
-                        if item['symbol'].endswith('USDT') 
-                        and 'USDT' not in item['symbol'][:-4]  # Excluir USDTUSDT
-                        and 'BTCDOM' not in item['symbol']
-                        and item['symbol'] not in EXCLUDED_PAIRS # FILTRO CRÍTICO
-                    ]
-                    
-                    # Ordenar por volumen (turnover24h = volumen en USDT)
-                    sorted_pairs = sorted(
-                        usdt_pairs, 
-                        key=lambda x: float(x.get('turnover24h', 0)), 
-                        reverse=True
-                    )
-                    
-                    self.pairs_cache = [p['symbol'] for p in sorted_pairs[:self.top_n]]
-                    print(f"📊 Top {len(self.pairs_cache)} pares cargados (excluidos {len(EXCLUDED_PAIRS)} pares prohibidos)")
-                    return self.pairs_cache
-                    
+            session = await self._get_session()
+            await self._bucket.acquire()
+            async with session.get(url) as response:
+                if response.status != 200:
+                    print(f"❌ Error obteniendo pares: {response.status}")
+                    return self.pairs_cache or []
+                
+                data = _json_loads(await response.read())
+                
+                if data.get('retCode') != 0:
+                    print(f"❌ Error API Bybit: {data.get('retMsg')}")
+                    return self.pairs_cache or []
+                
+                tickers = data.get('result', {}).get('list', [])
+                
+                # Filtrar pares USDT válidos (EXCLUDED_PAIRS es frozenset desde config)
+                usdt_pairs = []
+                for item in tickers:
+                    sym = item['symbol']
+                    if not sym.endswith('USDT'):
+                        continue
+                    if sym in EXCLUDED_PAIRS:  # FILTRO CRÍTICO
+                        continue
+                    if sym.startswith('BTCDOM') or 'USDT' in sym[:-4]:  # Excluir BTCDOM y USDTUSDT
+                        continue
+                    usdt_pairs.append(item)
+                
+                # Top N por volumen (turnover24h = volumen en USDT) sin ordenar la lista completa
+                top_pairs = heapq.nlargest(
+                    self.top_n,
+                    usdt_pairs,
+                    key=lambda x: float(x.get('turnover24h') or 0)
+                )
+                
+                self.pairs_cache = [p['symbol'] for p in top_pairs]
+                print(f"📊 Top {len(self.pairs_cache)} pares cargados (excluidos {len(EXCLUDED_PAIRS)} pares prohibidos)")
+                return self.pairs_cache
+                
         except Exception as e:
             print(f"❌ Error en get_top_pairs: {e}")
             return self.pairs_cache or []
     
     async def get_current_price(self, symbol: str) -> Optional[float]:
         """Obtener precio actual de un símbolo vía REST API"""
+        hit = self._ticker_cache.get(symbol)
+        if hit and time.monotonic() - hit[0] < TICKER_CACHE_TTL:
+            return hit[1]
+        
         url = f"{REST_BASE_URL}/v5/market/tickers"
         params = {"category": "linear", "symbol": symbol}
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params) as response:
-                    if response.status != 200:
-                        return None
-                    data = await response.json()
-                    
-                    if data.get('retCode') != 0:
-                        return None
-                    
-                    tickers = data.get('result', {}).get('list', [])
-                    if tickers:
-                        return float(tickers[0].get('lastPrice', 0))
-            return None
-        except Exception as e:
+            session = await self._get_session()
+            await self._bucket.acquire()
+            async with session.get(url, params=params) as response:
+                if response.status != 200:
+                    return None
+                data = _json_loads(await response.read())
+            
+            if data.get('retCode') != 0:
+                return None
+            
+            tickers = data.get('result', {}).get('list', [])
+            if not tickers:
+                return None
+            price = float(tickers[0].get('lastPrice', 0))
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, TypeError) as e:
             print(f"❌ Error obteniendo precio de {symbol}: {e}")
             return None
+        
+        _cache_put(self._ticker_cache, symbol, price, time.monotonic(), TICKER_CACHE_TTL)
+        return price
     
     async def fetch_klines(self, session: aiohttp.ClientSession, 
                            symbol: str, interval: str = '5m', 
                            limit: int = 100) -> List[dict]:
         """Obtener velas para un par desde Bybit (con paginación automática si limit > 1000)"""
-        # Convertir intervalo a formato Bybit (1, 3, 5, 15, 30, 60, 120, 240, 360, 720, D, M, W)
-        interval_map = {
-            '1m': '1', '3m': '3', '5m': '5', '15m': '15', '30m': '30',
-            '1h': '60', '2h': '120', '4h': '240', '6h': '360', '12h': '720',
-            '1d': 'D', '1w': 'W', '1M': 'M'
-        }
-        bybit_interval = interval_map.get(interval, '60')
-        
-        url = f"{REST_BASE_URL}/v5/market/kline"
-        all_candles = []
+        rows = await self._fetch_kline_rows(session, symbol, interval, limit)
+        return [
+            {
+                "time": int(c[0]) // 1000,
+                "open": float(c[1]),
+                "high": float(c[2]),
+                "low": float(c[3]),
+                "close": float(c[4]),
+                "volume": float(c[5])
+            }
+            for c in rows
+        ]
+    
+    async def fetch_closes(self, session: aiohttp.ClientSession,
+                           symbol: str, interval: str = '5m',
+                           limit: int = 100) -> List[float]:
+        """Obtener solo la columna de cierres (suficiente para RSI, sin dicts por vela)"""
+        rows = await self._fetch_kline_rows(session, symbol, interval, limit)
+        return [float(c[4]) for c in rows]
+    
+    async def _fetch_kline_rows(self, session: aiohttp.ClientSession,
+                                symbol: str, interval: str, limit: int) -> List[list]:
+        """Filas crudas de Bybit [time_ms, open, high, low, close, volume, ...] en orden ascendente"""
+        # Reutilizar descargas recientes (scan_all_pairs y run_priority_scan pueden solaparse)
+        key = (symbol, interval, limit)
+        now = time.monotonic()
+        hit = self._kline_cache.get(key)
+        if hit and now - hit[0] < KLINE_CACHE_TTL:
+            return hit[1]
+        
+        bybit_interval = _INTERVAL_MAP.get(interval, '60')
+        
+        url = _KLINE_URL
+        all_rows = []
         remaining = limit
         end_time = None
+        # Solo se cachea una descarga completa (no una cortada por error/429 a mitad de paginación)
+        complete = False
         
-        try:
-            while remaining > 0:
-                batch_limit = min(remaining, 1000)  # Bybit max 1000 per request
-                params = {"category": "linear", "symbol": symbol, "interval": bybit_interval, "limit": batch_limit}
-                
-                if end_time:
-                    params["end"] = end_time
-                
-                async with session.get(url, params=params) as response:
-                    if response.status != 200:
-                        break
-                    data = await response.json()
-                    
-                    if data.get('retCode') != 0:
-                        break
-                    
-                    klines = data.get('result', {}).get('list', [])
-                    if not klines:
-                        break
-                    
-                    # Bybit devuelve en orden descendente (más reciente primero)
-                    parsed = [
-                        {
-                            "time": int(c[0]) // 1000,
-                            "open": float(c[1]),
-                            "high": float(c[2]),
-                            "low": float(c[3]),
-                            "close": float(c[4]),
-                            "volume": float(c[5])
-                        }
-                        for c in klines
-                    ]
-                    
-                    # Insertar al inicio (son más antiguas)
-                    all_candles = parsed + all_candles
-                    
-                    remaining -= len(klines)
-                    
-                    if remaining > 0 and len(klines) == batch_limit:
-                        # Obtener timestamp de la vela más antigua para siguiente request
-                        end_time = int(klines[-1][0]) - 1  # -1 para no duplicar
-                    else:
-                        break
+        while remaining > 0:
+            batch_limit = min(remaining, 1000)  # Bybit max 1000 per request
+            params = {"category": "linear", "symbol": symbol, "interval": bybit_interval, "limit": batch_limit}
             
-            # Ordenar por tiempo ascendente
-            all_candles.sort(key=lambda x: x['time'])
-            return all_candles
+            if end_time:
+                params["end"] = end_time
             
-        except Exception as e:
-            return all_candles if all_candles else []
+            # Solo la frontera de red puede fallar: capturar ahí, no en todo el método
+            try:
+                async with self._rate:
+                    await self._bucket.acquire()
+                    async with session.get(url, params=params) as response:
+                        if response.status == 429:
+                            # Rate limit de Bybit: retener el slot para frenar al resto
+                            await asyncio.sleep(1)
+                            break
+                        if response.status != 200:
+                            break
+                        data = _json_loads(await response.read())
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+                break
+            
+            if data.get('retCode') != 0:
+                break
+            
+            klines = data.get('result', {}).get('list', [])
+            if not klines:
+                complete = True  # No hay más historial
+                break
+            
+            # Bybit devuelve en orden descendente (más reciente primero) y cada lote
+            # es más antiguo que el anterior: acumular en orden descendente
+            all_rows.extend(klines)
+            
+            remaining -= len(klines)
+            
+            if remaining > 0 and len(klines) == batch_limit:
+                # Obtener timestamp de la vela más antigua para siguiente request
+                end_time = int(klines[-1][0]) - 1  # -1 para no duplicar
+            else:
+                complete = True
+                break
+        
+        # Descendente -> ascendente en O(n) (sin sort)
+        all_rows.reverse()
+        if all_rows and complete:
+            _cache_put(self._kline_cache, key, all_rows, now, KLINE_CACHE_TTL)
+        return all_rows
     
-    def calculate_rsi(self, candles: List[dict], period: int = 14) -> float:
-        """Calcular RSI de las velas"""
-        if len(candles) < period + 1:
+    def calculate_rsi(self, closes: List[float], period: int = 14) -> float:
+        """Calcular RSI sobre la columna de cierres"""
+        if len(closes) < period + 1:
             return 50.0  # Valor neutral si no hay suficientes datos
         
-        closes = [c['close'] for c in candles]
-        deltas = [closes[i] - closes[i-1] for i in range(1, len(closes))]
-        
-        gains = [d if d > 0 else 0 for d in deltas]
-        losses = [-d if d < 0 else 0 for d in deltas]
-        
-        # EMA de ganancias y pérdidas
-        avg_gain = sum(gains[:period]) / period
-        avg_loss = sum(losses[:period]) / period
-        
-        for i in range(period, len(gains)):
-            avg_gain = (avg_gain * (period - 1) + gains[i]) / period
-            avg_loss = (avg_loss * (period - 1) + losses[i]) / period
-        
-        if avg_loss == 0:
-            return 100.0
-        
-        rs = avg_gain / avg_loss
-        rsi = 100 - (100 / (1 + rs))
-        
-        return rsi
+        return _wilder_rsi(closes, period)
+    
+    def _get_zigzag(self, symbol: str, candles: List[dict]) -> list:
+        """ZigZag cacheado por (timeframe, primera/última vela, high/low de la vela viva)"""
+        last = candles[-1]
+        key = (TIMEFRAME, len(candles), candles[0]['time'], last['time'], last['high'], last['low'])
+        
+        cached = self._zigzag_cache.get(symbol)
+        if cached and cached[0] == key:
+            return cached[1]
+        
+        zigzag = calculate_zigzag(candles, TIMEFRAME)
+        self._zigzag_cache[symbol] = (key, zigzag)
+        return zigzag
     
     async def scan_pair(self, session: aiohttp.ClientSession, 
                         symbol: str) -> Optional[List[ScanResult]]:
@@ -245,38 +421,53 @@ class MarketScanner:
         debido al sistema de 2 caminos
         """
         try:
-            # === OPTIMIZACIÓN: Fetch paralelo de RSI_TIMEFRAME (RSI) y TIMEFRAME (Fibo) ===
-            t_rsi_task = self.fetch_klines(session, symbol, self.rsi_timeframe, 100)
-            tfibo_task = self.fetch_klines(session, symbol, TIMEFRAME, CANDLE_LIMIT)
+            # Pre-filtro: RSI muy bajo hace menos de 60s -> no vale la pena ningún request
+            prev = self.last_rsi.get(symbol)
+            if prev:
+                prev_time, prev_rsi = prev
+                if prev_rsi < self.rsi_threshold - 10 and time.monotonic() - prev_time < 60:
+                    return None
             
-            candles_rsi, candles = await asyncio.gather(t_rsi_task, tfibo_task)
+            if self.rsi_timeframe == TIMEFRAME:
+                # Mismo timeframe para RSI y Fibo: un solo request, el RSI usa las últimas 100 velas
+                candles = await self.fetch_klines(session, symbol, TIMEFRAME, max(100, CANDLE_LIMIT))
+                closes_rsi = [c['close'] for c in candles[-100:]]
+            else:
+                # === RSI PRIMERO: la mayoría de pares no pasa el umbral, así que las velas
+                # de TIMEFRAME (Fibo) solo se descargan si el RSI lo supera ===
+                closes_rsi = await self.fetch_closes(session, symbol, self.rsi_timeframe, 100)
+                candles = None
             
-            if not candles_rsi:
+            if not closes_rsi:
                 # print(f"   [DEBUG] {symbol}: Sin velas {self.rsi_timeframe}")
                 return None
             
-            rsi = self.calculate_rsi(candles_rsi)
+            rsi = self.calculate_rsi(closes_rsi)
+            self.last_rsi[symbol] = (time.monotonic(), rsi)
             
             # Filtrar por RSI
             if rsi < self.rsi_threshold:
                 # print(f"   [DEBUG] {symbol}: RSI {rsi:.1f} < {self.rsi_threshold}")
                 return None
             
+            if candles is None:
+                candles = await self.fetch_klines(session, symbol, TIMEFRAME, CANDLE_LIMIT)
+            
             if len(candles) < 50:
                 # print(f"   [DEBUG] {symbol}: Pocas velas {TIMEFRAME} ({len(candles)})")
                 return None
             
-            # Calcular Fibonacci
-            zigzag = calculate_zigzag(candles, TIMEFRAME)
+            # Calcular Fibonacci (reutilizar ZigZag si las velas cerradas y la vela viva no cambiaron)
+            zigzag = self._get_zigzag(symbol, candles)
             if len(zigzag) < 2:
-                print(f"   [DEBUG] {symbol}: ZigZag insuficiente ({len(zigzag)} puntos)")
+                scanner_logger.debug("   [DEBUG] %s: ZigZag insuficiente (%d puntos)", symbol, len(zigzag))
                 return None
             
-            print(f"   📊 {symbol}: ZigZag OK ({len(zigzag)} puntos), buscando swing...")
+            scanner_logger.debug("   📊 %s: ZigZag OK (%d puntos), buscando swing...", symbol, len(zigzag))
             swings = find_valid_fibonacci_swing(zigzag, candles)
             
             if not swings:
-                print(f"   [DEBUG] {symbol}: No hay swing válido")
+                scanner_logger.debug("   [DEBUG] %s: No hay swing válido", symbol)
                 return None
             
             current_price = candles[-1]['close']
@@ -294,29 +485,27 @@ class MarketScanner:
                 print(f"   ✅ {symbol}: Swing válido {path_text}! Precio ${current_price:.4f} -> CASO {case}")
                 
                 if case == 0:
-                    print(f"   [DEBUG] {symbol}: Caso 0 (inválido) {path_text}")
+                    scanner_logger.debug("   [DEBUG] %s: Caso 0 (inválido) %s", symbol, path_text)
                     continue
                 
+                # Rango del swing calculado una sola vez para los niveles de respaldo
+                low = swing.low.price
+                rng = swing.high.price - low
+                levels = swing.levels
+                
+                fib_levels = {
+                    key: levels[src] if src in levels else (low + rng * ratio if ratio is not None else 0)
+                    for key, src, ratio in _RESULT_FIB_LEVELS
+                }
+                fib_levels['high'] = swing.high.price
+                fib_levels['low'] = low
+                
                 result = ScanResult(
                     symbol=symbol,
                     rsi=rsi,
                     case=case,
                     current_price=current_price,
-                    fib_levels={
-                        '40': swing.levels.get('40', swing.low.price + (swing.high.price - swing.low.price) * 0.40),
-                        '45': swing.levels.get('45', swing.low.price + (swing.high.price - swing.low.price) * 0.45),
-                        '50': swing.levels.get('50', 0),
-                        '55': swing.levels.get('55', swing.low.price + (swing.high.price - swing.low.price) * 0.55),
-                        '60': swing.levels.get('60', swing.low.price + (swing.high.price - swing.low.price) * 0.60),
-                        '62': swing.levels.get('62', swing.low.price + (swing.high.price - swing.low.price) * 0.62),
-                        '618': swing.levels.get('61.8', 0),
-                        '69': swing.levels.get('69', swing.low.price + (swing.high.price - swing.low.price) * 0.69),
-                        '70': swing.levels.get('70', swing.low.price + (swing.high.price - swing.low.price) * 0.70),
-                        '75': swing.levels.get('75', 0),
-                        '786': swing.levels.get('78.6', 0),
-                        'high': swing.high.price,
-                        'low': swing.low.price
-                    },
+                    fib_levels=fib_levels,
                     is_valid=True,
                     path=swing.path  # Guardar el path (1 = normal, 2 = alternativo)
                 )
@@ -335,30 +524,23 @@ class MarketScanner:
         """
         results = {1: [], 3: [], 4: []}  # Caso 2 eliminado
         
-        async with aiohttp.ClientSession() as session:
-            # Escanear en lotes (batch)
-            batch_size = 50
-            total_pairs = len(pairs)
-            
-            print(f"📊 Iniciando escaneo de {total_pairs} pares...")
-            
-            for i in range(0, total_pairs, batch_size):
-                batch = pairs[i:i+batch_size]
-                
-                print(f"   ⚡ Escaneando bloque {i+1}-{min(i+batch_size, total_pairs)} ({batch[0]}...)...")
-                
-                tasks = [self.scan_pair(session, symbol) for symbol in batch]
-                batch_results = await asyncio.gather(*tasks)
-                
-                for scan_results in batch_results:
-                    # scan_results ahora es una lista de ScanResult (o None)
-                    if scan_results:
-                        for result in scan_results:
-                            if result and result.is_valid:
-                                results[result.case].append(result)
-                                self.last_scan_results[result.symbol] = result
-                
-                await asyncio.sleep(0.5)
+        session = await self._get_session()
+        total_pairs = len(pairs)
+        
+        print(f"📊 Iniciando escaneo de {total_pairs} pares...")
+        
+        # Todos los pares en vuelo: la concurrencia real la acota el semáforo de fetch_klines
+        all_results = await asyncio.gather(
+            *(self.scan_pair(session, symbol) for symbol in pairs)
+        )
+        
+        for scan_results in all_results:
+            # scan_results ahora es una lista de ScanResult (o None)
+            if scan_results:
+                for result in scan_results:
+                    if result and result.is_valid:
+                        results[result.case].append(result)
+                        self.last_scan_results[result.symbol] = result
         
         print(f"🔍 Scan: C4: {len(results[4])} | C3: {len(results[3])} | C1: {len(results[1])}")  # Caso 2 eliminado
         return results
@@ -369,60 +551,59 @@ class MarketScanner:
         [WATCHDOG] Actualizar precios de posiciones abiertas Y órdenes pendientes vía REST API
         Esto sirve como fallback si el WebSocket falla.
         """
-        active_symbols = set()
-        if account.open_positions:
-            active_symbols.update(pos.symbol for pos in account.open_positions.values())
-        if account.pending_orders:
-            active_symbols.update(
-                (order.get('symbol') if isinstance(order, dict) else order.symbol)
-                for order in account.pending_orders.values()
-            )
-            
+        active_symbols = get_active_symbols(account)
         if not active_symbols:
             return
 
         # print(f"🛡️ Watchdog: Verificando precios REST para {len(active_symbols)} monedas...")
         
-        async with aiohttp.ClientSession() as session:
-            for symbol in list(active_symbols):
-                try:
-                    # Bybit endpoint para ticker
-                    url = f"{REST_BASE_URL}/v5/market/tickers?category=linear&symbol={symbol}"
-                    async with session.get(url) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            if data.get('retCode') == 0:
-                                tickers = data.get('result', {}).get('list', [])
-                                if tickers:
-                                    price = float(tickers[0]['lastPrice'])
-                                    
-                                    # Actualizar cache 
-                                    price_cache[symbol] = price
-                                    
-                                    # Validar TP/SL y Pending Orders
-                                    if account.open_positions:
-                                        account.check_positions(symbol, price)
-                                    if account.pending_orders:
-                                        account.check_pending_orders(symbol, price)
-                            
-                            # print(f"   🛡️ {symbol}: ${price}")
-                except Exception as e:
-                    print(f"   ❌ Error Watchdog {symbol}: {e}")
+        # Un solo request con todos los tickers lineales (1 RTT sin importar cuántas posiciones)
+        prices = await self._fetch_all_prices()
+        
+        for symbol in active_symbols:
+            price = prices.get(symbol)
+            if price is None:
+                continue
+            
+            # Actualizar cache 
+            price_cache[symbol] = price
+            
+            # Validar TP/SL y Pending Orders
+            if account.open_positions:
+                account.check_positions(symbol, price)
+            if account.pending_orders:
+                account.check_pending_orders(symbol, price)
+    
+    async def _fetch_all_prices(self) -> Dict[str, float]:
+        """Obtener {symbol: lastPrice} de todos los tickers lineales en un solo request"""
+        url = f"{REST_BASE_URL}/v5/market/tickers?category=linear"
+        try:
+            session = await self._get_session()
+            await self._bucket.acquire()
+            async with session.get(url) as response:
+                if response.status != 200:
+                    return {}
+                data = _json_loads(await response.read())
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            print(f"   ❌ Error Watchdog: {e}")
+            return {}
+        
+        if data.get('retCode') != 0:
+            return {}
+        
+        return {
+            t['symbol']: float(t['lastPrice'])
+            for t in data.get('result', {}).get('list', [])
+            if t.get('lastPrice')
+        }
 
 async def run_priority_scan(scanner: MarketScanner, account, margin_per_trade: float = 3.0):
     """
     Ejecutar escaneo EN TIEMPO REAL
     Las órdenes se colocan INMEDIATAMENTE cuando se encuentra un par válido
     """
-    from paper_trading import OrderSide
-    
     # Obtener límite de operaciones simultáneas
-    try:
-        with open('shared_config.json', 'r') as f:
-            config = json.load(f)
-            max_ops = config.get('trading', {}).get('max_simultaneous_operations', 20)
-    except:
-        max_ops = 20
+    max_ops = get_max_simultaneous_operations()
     
     # Usar cache si está definido, sino hacer fetch
     if scanner.pairs_cache:
@@ -438,14 +619,20 @@ async def run_priority_scan(scanner: MarketScanner, account, margin_per_trade: f
     total_pairs = len(pairs)
     orders_placed = 0
     
+    # Índice de símbolos con operación activa (posición u orden pendiente) - lookup O(1).
+    # Se construye una vez por escaneo y se amplía con cada orden colocada.
+    existing_symbols = get_active_symbols(account)
+    
     print(f"📊 Escaneando {total_pairs} pares en paralelo...")
     
-    BATCH_SIZE = 50  # Optimizado: de 20 a 50
+    session = await scanner._get_session()
+    # Todos los pares en vuelo: la concurrencia real la acota el semáforo de fetch_klines
+    tasks = [asyncio.ensure_future(scanner.scan_pair(session, symbol)) for symbol in pairs]
     
-    async with aiohttp.ClientSession() as session:
-        # Procesar en batches para velocidad
-        for batch_start in range(0, total_pairs, BATCH_SIZE):
-            # Verificar límite antes de cada batch
+    try:
+        # Procesar resultados según llegan y colocar órdenes INMEDIATAMENTE
+        for next_done in asyncio.as_completed(tasks):
+            # Verificar límites antes de cada resultado
             current_ops = len(account.open_positions) + len(account.pending_orders)
             if current_ops >= max_ops:
                 print(f"⚠️ Límite alcanzado: {current_ops}/{max_ops}")
@@ -455,260 +642,173 @@ async def run_priority_scan(scanner: MarketScanner, account, margin_per_trade: f
                 print(f"⚠️ Margen mínimo: ${account.get_available_margin():.2f}")
                 break
             
-            batch_end = min(batch_start + BATCH_SIZE, total_pairs)
-            batch_pairs = pairs[batch_start:batch_end]
-            
-            # Escanear batch en paralelo
-            tasks = [scanner.scan_pair(session, symbol) for symbol in batch_pairs]
-            batch_results = await asyncio.gather(*tasks, return_exceptions=True)
+            try:
+                scan_results = await next_done
+            except Exception:
+                continue
+            if not scan_results:
+                continue
             
-            # Procesar resultados y colocar órdenes INMEDIATAMENTE
-            for symbol, scan_results in zip(batch_pairs, batch_results):
-                if isinstance(scan_results, Exception):
-                    continue
-                if not scan_results:
+            for result in scan_results:
+                if not result or not result.is_valid:
                     continue
                 
-                for result in scan_results:
-                    if not result or not result.is_valid:
-                        continue
-                    
-                    # Re-verificar límites antes de cada orden
-                    current_ops = len(account.open_positions) + len(account.pending_orders)
-                    if current_ops >= max_ops:
-                        break
-
-                    case_num = result.case
-                    
-                    # Verificar duplicados - Solo 1 operación por símbolo
-                    existing = any(p.symbol == result.symbol for p in account.open_positions.values())
-                    existing = existing or any(
-                        (o.get('symbol') if isinstance(o, dict) else o.symbol) == result.symbol 
-                        for o in account.pending_orders.values()
-                    )
-                    if existing:
-                        continue
-                    
-                    fib_range = result.fib_levels.get('high', 0) - result.fib_levels.get('low', 0)
-                    sl_price = None
-                    
-                    # Colocar orden INMEDIATAMENTE
-                    order_placed, order_id, primary_sl = await _place_order_for_case(
-                        scanner, account, result, case_num, 
-                        margin_per_trade, fib_range, sl_price, OrderSide, session
-                    )
-                    
-                    if order_placed:
-                        orders_placed += 1
+                # Re-verificar límites antes de cada orden
+                current_ops = len(account.open_positions) + len(account.pending_orders)
+                if current_ops >= max_ops:
+                    break
 
-            
-            # Pausa eliminada para máxima velocidad
-            pass
+                case_num = result.case
+                
+                # Verificar duplicados - Solo 1 operación por símbolo
+                if result.symbol in existing_symbols:
+                    continue
+                
+                fib_range = result.fib_levels.get('high', 0) - result.fib_levels.get('low', 0)
+                sl_price = None
+                
+                # Colocar orden INMEDIATAMENTE
+                order_placed, order_id, primary_sl = await _place_order_for_case(
+                    scanner, account, result, case_num, 
+                    margin_per_trade, fib_range, sl_price, OrderSide, session
+                )
+                
+                if order_placed:
+                    orders_placed += 1
+                    existing_symbols.add(result.symbol)
+    finally:
+        # Si se cortó por límite/margen, no seguir descargando velas en segundo plano
+        for task in tasks:
+            task.cancel()
     
     print(f"\n📊 Escaneo completado: {orders_placed} órdenes colocadas")
     print(f"💰 Margen disponible: ${account.get_available_margin():.2f}")
 
 
-async def _place_order_for_case(scanner, account, result, case_num, margin_per_trade, fib_range, sl_price, OrderSide, session=None):
-    """Helper para colocar una orden según el caso. Retorna (success, order_id, sl_price)"""
-    order_placed = False
-    order_id = None
-    final_sl = None
-    fresh_price = 0.0
+# --- Nueva Lógica: Ganancia Bruta y Protección de Comisiones ---
+def calculate_trade_params(symbol: str, entry_price: float, tp_price: float):
+    """
+    Calcula Qty para Ganancia Bruta = TARGET_PROFIT
+    Retorna (Qty, Margin, Estimated_Commission, Allowed)
+    """
+    price_diff = abs(entry_price - tp_price)
+    if price_diff == 0:
+        return 0, 0, 0, False
+        
+    # 1. Calcular Qty para Ganancia Bruta (TARGET_PROFIT = $1)
+    # Ganancia Bruta = Qty * |Entry - TP|
+    # Qty = TARGET_PROFIT / |Entry - TP|
+    qty = TARGET_PROFIT / price_diff
     
-    # Obtener configuración de estrategias y trading
-    strategies = get_strategy_config()
+    # 2. Calcular Margin Requerido
+    margin = (qty * entry_price) / LEVERAGE
     
-    # Leer niveles de entrada desde shared_config.json
-    try:
-        with open('shared_config.json', 'r') as f:
-            config = json.load(f)
-            trading = config.get('trading', {})
-            case_1_max_3_min = trading.get('case_1_max_3_min', 0.67)
-            case_3_max_4_min = trading.get('case_3_max_4_min', 0.79)
-            case_4_max = trading.get('case_4_max', 0.90)
-    except:
-        case_1_max_3_min = 0.67
-        case_3_max_4_min = 0.79
-        case_4_max = 0.90
+    # 3. Calcular Comisión Estimada (Apertura + Cierre)
+    # Asumimos peor caso: Taker en Open (si es Market) y Maker en Close (TP Limit)
+    # O Maker/Maker si es Limit. Para seguridad usamos un promedio o el peor caso.
+    # Simplificación: Usamos COMMISSION_RATE general (0.06% = 0.0006)
+    # Comm = Qty * (Entry + TP) * Rate
+    est_commission = qty * (entry_price + tp_price) * COMMISSION_RATE
+    
+    # 4. Regla de Protección: Comisión < 50% de la Ganancia Bruta
+    # Si ganamos $1, no queremos pagar más de $0.50 en comisiones
+    if est_commission > (TARGET_PROFIT / 2):
+        scanner_logger.debug("   🚫 %s: Comisión alta ($%.4f) vs Profit ($%s)", symbol, est_commission, TARGET_PROFIT)
+        return qty, margin, est_commission, False
+        
+    if margin > MAX_MARGIN_PER_TRADE:
+         # Ajustar al máximo margen permitido (reducir Qty)
+         # Esto reducirá la ganancia bruta esperada, pero es un límite duro de seguridad
+         qty = (MAX_MARGIN_PER_TRADE * LEVERAGE) / entry_price
+         margin = MAX_MARGIN_PER_TRADE
+         # Recalcular comisión
+         est_commission = qty * (entry_price + tp_price) * COMMISSION_RATE
     
-    # Obtener precio fresco para registrar 'creation_price' precisa
-    if not fresh_price or fresh_price == 0.0:
-         fresh_price = result.current_price if hasattr(result, 'current_price') else 0.0
+    return qty, margin, est_commission, True
 
-    # --- Nueva Lógica: Ganancia Bruta y Protección de Comisiones ---
-    def calculate_trade_params(entry_price, tp_price):
-        """
-        Calcula Qty para Ganancia Bruta = TARGET_PROFIT
-        Retorna (Qty, Margin, Estimated_Commission, Allowed)
-        """
-        price_diff = abs(entry_price - tp_price)
-        if price_diff == 0:
-            return 0, 0, 0, False
-            
-        # 1. Calcular Qty para Ganancia Bruta (TARGET_PROFIT = $1)
-        # Ganancia Bruta = Qty * |Entry - TP|
-        # Qty = TARGET_PROFIT / |Entry - TP|
-        qty = TARGET_PROFIT / price_diff
-        
-        # 2. Calcular Margin Requerido
-        margin = (qty * entry_price) / LEVERAGE
-        
-        # 3. Calcular Comisión Estimada (Apertura + Cierre)
-        # Asumimos peor caso: Taker en Open (si es Market) y Maker en Close (TP Limit)
-        # O Maker/Maker si es Limit. Para seguridad usamos un promedio o el peor caso.
-        # Simplificación: Usamos COMMISSION_RATE general (0.06% = 0.0006)
-        # Comm = Qty * (Entry + TP) * Rate
-        est_commission = qty * (entry_price + tp_price) * COMMISSION_RATE
-        
-        # 4. Regla de Protección: Comisión < 50% de la Ganancia Bruta
-        # Si ganamos $1, no queremos pagar más de $0.50 en comisiones
-        if est_commission > (TARGET_PROFIT / 2):
-            print(f"   🚫 {result.symbol}: Comisión alta (${est_commission:.4f}) vs Profit (${TARGET_PROFIT})")
-            return qty, margin, est_commission, False
-            
-        if margin > MAX_MARGIN_PER_TRADE:
-             # Ajustar al máximo margen permitido (reducir Qty)
-             # Esto reducirá la ganancia bruta esperada, pero es un límite duro de seguridad
-             qty = (MAX_MARGIN_PER_TRADE * LEVERAGE) / entry_price
-             margin = MAX_MARGIN_PER_TRADE
-             # Recalcular comisión
-             est_commission = qty * (entry_price + tp_price) * COMMISSION_RATE
-        
-        return qty, margin, est_commission, True
 
-    if case_num == 4:
-        # Caso 4: LIMIT ORDER al nivel actual + 0.005 (0.5%)
-        # Ejemplo: Si está en 0.82, poner orden en 0.825
-        if not fresh_price or fresh_price == 0.0:
+# Especificación por caso para _place_order_for_case (todos son LIMIT SELL):
+# - entry: (clave en shared_config['trading'], default) del nivel Fib de entrada
+# - cfg / default_cfg: estrategia TP/SL en shared_config['strategies']
+# - zone_max: si existe, el precio actual debe estar en [entry, zone_max) y la orden se
+#   coloca sobre el precio actual + `offset` del rango Fib (Caso 4)
+_CASE_SPEC = {
+    1: {'emoji': '🟢', 'entry': ('case_1_max_3_min', 0.67),
+        'cfg': 'c1', 'default_cfg': {'tp': 0.51, 'sl': 0.67}, 'zone_max': None, 'offset': 0.0},
+    3: {'emoji': '🟠', 'entry': ('case_3_max_4_min', 0.79),
+        'cfg': 'c3', 'default_cfg': {'tp': 0.62, 'sl': 0.94}, 'zone_max': None, 'offset': 0.0},
+    4: {'emoji': '🔴', 'entry': ('case_3_max_4_min', 0.79),
+        'cfg': 'c4', 'default_cfg': {'tp': 0.65, 'sl': 1.265}, 'zone_max': ('case_4_max', 0.90), 'offset': 0.005},
+}
+
+
+async def _place_order_for_case(scanner, account, result, case_num, margin_per_trade, fib_range, sl_price, OrderSide, session=None):
+    """Helper para colocar una orden según el caso. Retorna (success, order_id, sl_price)"""
+    spec = _CASE_SPEC.get(case_num)
+    if spec is None:
+        return False, None, None
+    
+    # Niveles de entrada (shared_config.json cacheado por mtime) y TP/SL del caso
+    trading = _load_shared_config().get('trading', {})
+    case_config = get_strategy_config().get(spec['cfg'], spec['default_cfg'])
+    
+    symbol = result.symbol
+    fib_low = result.fib_levels.get('low', 0)
+    entry_level = fib_low + fib_range * trading.get(*spec['entry'])
+    tp_price = fib_low + fib_range * case_config['tp']
+    sl_price = fib_low + fib_range * case_config['sl'] if case_config.get('sl') else None
+    
+    # Precio para registrar 'creation_price': el close del escaneo recién descargado.
+    # (price_cache del WebSocket solo sigue pares activos; para candidatos sería un valor viejo)
+    fresh_price = result.current_price or 0.0
+    
+    entry_fib_level = None
+    if spec['zone_max']:
+        # Caso 4: LIMIT al precio actual + 0.5% del rango Fib (si está en 0.82, poner en 0.825)
+        if not fresh_price:
             return False, None, None
         
-        level_case4_min = result.fib_levels.get('low', 0) + fib_range * case_3_max_4_min
-        level_case4_max = result.fib_levels.get('low', 0) + fib_range * case_4_max
-        
         # Validar zona (79% - 90%)
-        if fresh_price < level_case4_min or fresh_price >= level_case4_max:
-            print(f"   ⚠️ {result.symbol}: Precio cambió, ya no está en zona C4")
+        level_max = fib_low + fib_range * trading.get(*spec['zone_max'])
+        if fresh_price < entry_level or fresh_price >= level_max:
+            scanner_logger.debug("   ⚠️ %s: Precio cambió, ya no está en zona C%d", symbol, case_num)
             return False, None, None
         
-        # Calcular precio Límite: Precio Actual + 0.5% de Fib
-        # NOTA: El usuario pidió "si está en 0.82, poner en 0.825"
-        limit_price = fresh_price + (fib_range * 0.005)
-        
-        # TP y SL desde configuración
-        c4_config = strategies.get('c4', {'tp': 0.65, 'sl': 1.265})
-        tp_price = result.fib_levels.get('low', 0) + fib_range * c4_config['tp']
-        sl_price = result.fib_levels.get('low', 0) + fib_range * c4_config['sl'] if c4_config.get('sl') else None
-        
-        # Calcular parámetros
-        qty, margin, est_comm, allowed = calculate_trade_params(limit_price, tp_price)
-        
-        if not allowed:
-            return False, None, None
-
-        order = account.place_limit_order(
-            symbol=result.symbol,
-            side=OrderSide.SELL,
-            price=limit_price,
-            margin=margin,
-            take_profit=tp_price,
-            stop_loss=sl_price,
-            strategy_case=case_num,
-            fib_high=result.fib_levels.get('high'),
-            fib_low=result.fib_levels.get('low'),
-            entry_fib_level=(limit_price - result.fib_levels.get('low', 0)) / fib_range,
-            current_price=fresh_price,
-            estimated_commission=est_comm
-        )
-        if order:
-            sl_str = f" | SL ${sl_price:.4f}" if sl_price else ""
-            fib_entry = (limit_price - result.fib_levels.get('low', 0)) / fib_range
-            print(f"   🔴 CASO 4 | {result.symbol}: LIMIT @ ${limit_price:.4f} (Fib {fib_entry*100:.1f}%) → TP ${tp_price:.4f}{sl_str}")
-            order_placed = True
-            
-            if isinstance(order, dict):
-                order_id = order.get('id') or order.get('order_id')
-            else:
-                order_id = getattr(order, 'id', getattr(order, 'order_id', None))
-                
-            final_sl = sl_price
-        else:
-            print(f"   ❌ CASO 4 | {result.symbol}: Orden no colocada (ver logs)")
+        limit_price = fresh_price + fib_range * spec['offset']
+        entry_fib_level = (limit_price - fib_low) / fib_range
+    else:
+        # Casos 1 y 3: LIMIT en el nivel Fib configurado
+        limit_price = entry_level
     
-    elif case_num == 3:
-        # Caso 3: LIMIT al nivel case_3_max_4_min (por defecto 79%)
-        limit_price = result.fib_levels.get('low', 0) + fib_range * case_3_max_4_min
-        
-        # TP y SL desde configuración
-        c3_config = strategies.get('c3', {'tp': 0.62, 'sl': 0.94})
-        tp_price = result.fib_levels.get('low', 0) + fib_range * c3_config['tp']
-        sl_price = result.fib_levels.get('low', 0) + fib_range * c3_config['sl'] if c3_config.get('sl') else None
-        
-        # Calcular parámetros
-        qty, margin, est_comm, allowed = calculate_trade_params(limit_price, tp_price)
-        
-        if not allowed:
-            return False, None, None
-            
-        order = account.place_limit_order(
-            symbol=result.symbol,
-            side=OrderSide.SELL,
-            price=limit_price,
-            margin=margin,
-            take_profit=tp_price,
-            stop_loss=sl_price,
-            strategy_case=case_num,
-            fib_high=result.fib_levels.get('high'),
-            fib_low=result.fib_levels.get('low'),
-            current_price=fresh_price,
-            estimated_commission=est_comm
-        )
-        if order:
-            sl_str = f" | SL ${sl_price:.4f}" if sl_price else ""
-            print(f"   🟠 CASO 3 | {result.symbol}: LIMIT @ ${limit_price:.4f} → TP ${tp_price:.4f}{sl_str}")
-            order_placed = True
-            order_id = order['id'] if isinstance(order, dict) else order.id
-            final_sl = sl_price
+    qty, margin, est_comm, allowed = calculate_trade_params(symbol, limit_price, tp_price)
+    if not allowed:
+        return False, None, None
     
-    # Caso 2 eliminado - ya no existe
+    order = account.place_limit_order(
+        symbol=symbol,
+        side=OrderSide.SELL,
+        price=limit_price,
+        margin=margin,
+        take_profit=tp_price,
+        stop_loss=sl_price,
+        strategy_case=case_num,
+        fib_high=result.fib_levels.get('high'),
+        fib_low=result.fib_levels.get('low'),
+        entry_fib_level=entry_fib_level,
+        current_price=fresh_price,
+        estimated_commission=est_comm
+    )
+    if not order:
+        print(f"   ❌ CASO {case_num} | {symbol}: Orden no colocada (ver logs)")
+        return False, None, None
     
-    elif case_num == 1:
-        # Caso 1: LIMIT SELL al nivel case_1_max_3_min (por defecto 67%)
-        
-        # TP y SL desde configuración
-        c1_config = strategies.get('c1', {'tp': 0.51, 'sl': 0.67})
-        tp_price = result.fib_levels.get('low', 0) + fib_range * c1_config['tp']
-        sl_price = result.fib_levels.get('low', 0) + fib_range * c1_config['sl'] if c1_config.get('sl') else None
-        # LIMIT SELL al nivel configurado
-        limit_price = result.fib_levels.get('low', 0) + fib_range * case_1_max_3_min
-        
-        # Calcular parámetros
-        qty, margin, est_comm, allowed = calculate_trade_params(limit_price, tp_price)
-        
-        if not allowed:
-            return False, None, None
-            
-        order = account.place_limit_order(
-            symbol=result.symbol,
-            side=OrderSide.SELL,
-            price=limit_price,
-            margin=margin,
-            take_profit=tp_price,
-            stop_loss=sl_price,
-            strategy_case=1,
-            fib_high=result.fib_levels.get('high'),
-            fib_low=result.fib_levels.get('low'),
-            current_price=fresh_price,
-            estimated_commission=est_comm
-        )
-        if order:
-            sl_str = f" | SL ${sl_price:.4f}" if sl_price else ""
-            print(f"   🟢 CASO 1 | {result.symbol}: LIMIT @ ${limit_price:.4f} → TP ${tp_price:.4f}{sl_str}")
-            order_placed = True
-            order_id = order['id'] if isinstance(order, dict) else order.id
-            final_sl = sl_price
+    sl_str = f" | SL ${sl_price:.4f}" if sl_price else ""
+    fib_str = f" (Fib {entry_fib_level*100:.1f}%)" if entry_fib_level is not None else ""
+    print(f"   {spec['emoji']} CASO {case_num} | {symbol}: LIMIT @ ${limit_price:.4f}{fib_str} → TP ${tp_price:.4f}{sl_str}")
     
-    return order_placed, order_id, final_sl
-
-
-
+    if isinstance(order, dict):
+        order_id = order.get('id') or order.get('order_id')
+    else:
+        order_id = getattr(order, 'id', getattr(order, 'order_id', None))
+    
+    return True, order_id, sl_price
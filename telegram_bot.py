@@ -4,12 +4,24 @@ Envía reportes automáticos cada 20 minutos y responde a comandos
 """
 import asyncio
 import aiohttp
+import atexit
 import os
 import json
+import time
 from datetime import datetime
 from typing import Optional, Dict, List
 from dataclasses import dataclass
 
+try:
+    import orjson  # Opcional: parseo/serialización JSON más rápidos
+    _json_loads = orjson.loads
+    
+    def _json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+except ImportError:
+    _json_loads = json.loads
+    _json_dumps = json.dumps
+
 from logger import telegram_logger as logger
 from config import TELEGRAM_TOKEN, TRADES_FILE
 
@@ -21,8 +33,8 @@ def load_authorized_chats() -> set:
     """Cargar chats autorizados desde archivo"""
     if os.path.exists(CHATS_FILE):
         try:
-            with open(CHATS_FILE, 'r') as f:
-                return set(json.load(f))
+            with open(CHATS_FILE, 'rb') as f:
+                return set(_json_loads(f.read()))
         except Exception as e:
             logger.error(f"Error cargando chats: {e}")
             return set()
@@ -32,7 +44,7 @@ def save_authorized_chats():
     """Guardar chats autorizados a archivo"""
     try:
         with open(CHATS_FILE, 'w') as f:
-            json.dump(list(AUTHORIZED_CHATS), f)
+            f.write(_json_dumps(list(AUTHORIZED_CHATS)))
     except Exception as e:
         logger.error(f"Error guardando chats: {e}")
 
@@ -46,6 +58,38 @@ if _default_chat_id and _default_chat_id.lstrip("-").isdigit():
     save_authorized_chats()
 
 
+# Tablas de formato precalculadas (se indexan por caso / por bool en los loops de reportes)
+_CASE_STR = {i: (f"C{i}" if i else "?") for i in range(8)}
+_PNL_EMOJI = ("🔴", "🟢")      # [pnl >= 0]
+_REASON_EMOJI = ("❌", "✅")   # [reason == 'TP']
+
+
+# Plantillas HTML de alertas de trade (se rellenan con str.format en send_trade_alert)
+_ALERT_TEMPLATES = {
+    "OPEN": """
+🟢 <b>NUEVA POSICIÓN</b>
+
+📊 {symbol} (Caso {case})
+├ Lado: {side}
+└ Entrada: <code>${price:.4f}</code>
+""",
+    "CLOSE": """
+{emoji} <b>POSICIÓN CERRADA</b>
+
+📊 {symbol}
+├ Precio: <code>${price:.4f}</code>
+└ {pnl_emoji} PnL: <code>${pnl:.4f}</code>
+""",
+    "LIMIT_FILLED": """
+⚡ <b>ORDEN LÍMITE EJECUTADA</b>
+
+📊 {symbol} (Caso {case})
+├ Lado: {side}
+└ Precio: <code>${price:.4f}</code>
+""",
+}
+
+
 @dataclass
 class TelegramConfig:
     token: str = TELEGRAM_TOKEN
@@ -64,26 +108,77 @@ class TelegramBot:
         self.account = None  # Se asigna después
         self.scanner = None  # Se asigna después
         self.price_cache: Dict[str, float] = {}
+        # Sesión HTTP persistente hacia api.telegram.org (reutiliza TCP/TLS entre llamadas)
+        self._session: Optional[aiohttp.ClientSession] = None
+        # Chats nuevos pendientes de guardar (se escriben en lote, no en cada /start)
+        self._chats_dirty = False
+        self._chat_tuple: tuple = ()
+        atexit.register(self.flush_chats)
+        # Agregados incrementales de trade_history (ver _aggregate)
+        self._report_cache: Dict = {}
+        # Último refresco de PnL: (monotonic, nº de posiciones) para no recalcular en ráfagas de comandos
+        self._last_pnl_refresh = (0.0, -1)
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Obtener la sesión HTTP compartida (se crea de forma perezosa)"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=32, limit_per_host=8, ttl_dns_cache=300, keepalive_timeout=75),
+                json_serialize=_json_dumps,
+                timeout=aiohttp.ClientTimeout(total=15, sock_read=10, sock_connect=5)
+            )
+        return self._session
+    
+    def _chats_snapshot(self) -> tuple:
+        """Tupla de AUTHORIZED_CHATS, reconstruida solo si cambió (los chats solo se añaden)"""
+        snapshot = self._chat_tuple
+        if len(snapshot) != len(AUTHORIZED_CHATS):
+            snapshot = self._chat_tuple = tuple(AUTHORIZED_CHATS)
+        return snapshot
+    
+    def mark_chats_dirty(self):
+        """Marcar AUTHORIZED_CHATS como modificado (se guarda en el próximo flush)"""
+        self._chats_dirty = True
+    
+    def flush_chats(self):
+        """Guardar telegram_chats.json si hubo cambios desde el último flush"""
+        if self._chats_dirty:
+            self._chats_dirty = False
+            save_authorized_chats()
+    
+    async def _flush_chats_loop(self, interval: float = 5):
+        """Guardar chats autorizados como máximo cada `interval` segundos"""
+        while self.running:
+            await asyncio.sleep(interval)
+            self.flush_chats()
+    
+    async def aclose(self):
+        """Cerrar la sesión HTTP compartida"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
         
     async def send_message(self, chat_id: int, text: str, 
-                           parse_mode: str = "HTML") -> bool:
-        """Enviar mensaje a un chat"""
+                           parse_mode: Optional[str] = "HTML") -> bool:
+        """Enviar mensaje a un chat (parse_mode=None para texto plano)"""
         url = f"{self.api_url}/sendMessage"
         payload = {
             "chat_id": chat_id,
             "text": text,
-            "parse_mode": parse_mode
+            "disable_web_page_preview": True
         }
+        if parse_mode:
+            payload["parse_mode"] = parse_mode
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=payload) as response:
-                    if response.status == 200:
-                        return True
-                    else:
-                        error = await response.text()
-                        logger.error(f"Error enviando mensaje: {error}")
-                        return False
+            session = await self._get_session()
+            async with session.post(url, json=payload) as response:
+                if response.status == 200:
+                    return True
+                else:
+                    error = await response.text()
+                    logger.error(f"Error enviando mensaje: {error}")
+                    return False
         except Exception as e:
             logger.error(f"Error en send_message: {e}")
             return False
@@ -95,7 +190,12 @@ class TelegramBot:
         try:
             # Asegurar que el path sea absoluto
             abs_path = os.path.abspath(file_path)
-            if not os.path.exists(abs_path):
+            
+            # Abrir fuera del event loop; aiohttp sube el archivo por bloques leídos en
+            # el executor, sin cargarlo entero en memoria
+            try:
+                f = await asyncio.to_thread(open, abs_path, 'rb')
+            except FileNotFoundError:
                 await self.send_message(chat_id, f"⚠️ Archivo no encontrado: {os.path.basename(abs_path)}")
                 return False
 
@@ -103,31 +203,51 @@ class TelegramBot:
             data.add_field('chat_id', str(chat_id))
             data.add_field('caption', caption)
             
-            # Usar 'with' para asegurar que el archivo se cierre
-            with open(abs_path, 'rb') as f:
+            # Cerrar el archivo siempre, incluso si falla el envío
+            with f:
                 data.add_field('document', f, filename=os.path.basename(abs_path))
 
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(url, data=data) as response:
-                        if response.status == 200:
-                            return True
-                        else:
-                            error = await response.text()
-                            logger.error(f"Error enviando documento: {error}")
-                            await self.send_message(chat_id, f"❌ Error de Telegram al enviar: {response.status}")
-                            return False
+                session = await self._get_session()
+                async with session.post(url, data=data, timeout=aiohttp.ClientTimeout(total=120)) as response:
+                    if response.status == 200:
+                        return True
+                    else:
+                        error = await response.text()
+                        logger.error(f"Error enviando documento: {error}")
+                        await self.send_message(chat_id, f"❌ Error de Telegram al enviar: {response.status}")
+                        return False
         except Exception as e:
             logger.error(f"Error en send_document: {e}")
             await self.send_message(chat_id, f"❌ Error interno al enviar archivo: {str(e)}")
             return False
     
-    async def broadcast_message(self, text: str):
+    async def broadcast_message(self, text: str, parse_mode: Optional[str] = "HTML"):
         """Enviar mensaje a todos los chats autorizados"""
-        if not AUTHORIZED_CHATS:
+        # Snapshot inmutable: process_update puede añadir chats mientras se envía
+        chat_ids = self._chats_snapshot()
+        if not chat_ids:
             return
             
-        for chat_id in AUTHORIZED_CHATS:
-            await self.send_message(chat_id, text)
+        # Envíos en paralelo sobre la sesión compartida; un chat fallido no cancela el resto
+        results = await asyncio.gather(
+            *(self.send_message(chat_id, text, parse_mode) for chat_id in chat_ids),
+            return_exceptions=True
+        )
+        for chat_id, result in zip(chat_ids, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error en broadcast a {chat_id}: {result}")
+    
+    def _refresh_pnl(self, max_age: float = 0.25):
+        """Actualizar PnL de posiciones con price_cache si el último refresco es viejo o cambiaron las posiciones"""
+        if not self.price_cache:
+            return
+        now = time.monotonic()
+        n_positions = len(self.account.open_positions)
+        last_ts, last_n = self._last_pnl_refresh
+        if n_positions == last_n and now - last_ts < max_age:
+            return
+        self.account.update_positions_pnl(self.price_cache)
+        self._last_pnl_refresh = (now, n_positions)
     
     def format_report(self) -> str:
         """Generar reporte COMPLETO para Telegram (Cuenta + Stats + Posiciones + Historial)"""
@@ -135,33 +255,26 @@ class TelegramBot:
             return "⚠️ Bot no inicializado"
         
         # Actualizar PnL con precios actuales antes de generar reporte
-        if self.price_cache:
-            self.account.update_positions_pnl(self.price_cache)
+        self._refresh_pnl()
         
         status = self.account.get_status()
-        now = datetime.now().strftime("%H:%M:%S %d/%m/%Y")
-        
-        # Historial
-        history = self.account.trade_history
-        total_trades = len(history)
-        winners = sum(1 for t in history if t.get('pnl', 0) > 0)
-        losers = sum(1 for t in history if t.get('pnl', 0) < 0)
+        # Una sola lectura del reloj para la hora del reporte y el conteo de trades de hoy
+        now_dt = datetime.now()
+        now = now_dt.strftime("%H:%M:%S %d/%m/%Y")
+        
+        # Historial (agregados en una sola pasada, cacheados)
+        agg = self._aggregate(now_dt.date().isoformat())
+        total_trades = agg['total']
+        winners = agg['winners']
+        losers = agg['losers']
         win_rate = (winners / total_trades * 100) if total_trades > 0 else 0
-        
-        # PnL
-        total_pnl = sum(t.get('pnl', 0) for t in history)
+        total_pnl = agg['total_pnl']
+        cases = agg['by_case']
         
         # Emoji según PnL
-        pnl_emoji = "🟢" if status['total_unrealized_pnl'] >= 0 else "🔴"
+        pnl_emoji = _PNL_EMOJI[status['total_unrealized_pnl'] >= 0]
         balance_emoji = "📈" if self.account.balance >= self.account.initial_balance else "📉"
         
-        # Por caso (stats)
-        cases = {1: [], 2: [], 3: [], 4: []}
-        for t in history:
-            case = t.get('strategy_case', 0)
-            if case in cases:
-                cases[case].append(t.get('pnl', 0))
-        
         # Balance Margin (Equity) = balance + PnL flotante
         margin_balance = status['balance'] + status['total_unrealized_pnl']
         
@@ -177,50 +290,112 @@ class TelegramBot:
 └ Margen Disp.: <code>${status['available_margin']:.2f}</code>
 
 <b>📈 RENDIMIENTO</b>
-├ Total Trades: <code>{total_trades}</code> (Hoy: {self._count_today_trades()})
+├ Total Trades: <code>{total_trades}</code> (Hoy: {agg['today']})
 ├ Win Rate: <code>{win_rate:.1f}%</code> ({winners}W - {losers}L)
 ├ PnL Acumulado: <code>${total_pnl:.4f}</code>
-└ Profit Factor: <code>{self._calculate_profit_factor():.2f}</code>
+└ Profit Factor: <code>{self._calculate_profit_factor(agg):.2f}</code>
 
 <b>🎯 POR CASO</b>
-├ C1: {len(cases[1])} trades | ${sum(cases[1]):.2f}
-├ C3: {len(cases[3])} trades | ${sum(cases[3]):.2f}
-└ C4: {len(cases[4])} trades | ${sum(cases[4]):.2f}
-"""
-        report += "\n💡 /download para bajar el historial completo"
+├ C1: {cases[1][0]} trades | ${cases[1][1]:.2f}
+├ C3: {cases[3][0]} trades | ${cases[3][1]:.2f}
+└ C4: {cases[4][0]} trades | ${cases[4][1]:.2f}
+
+💡 /download para bajar el historial completo"""
         return report
     
-    def _calculate_profit_factor(self) -> float:
+    def _aggregate(self, today: Optional[str] = None) -> Dict:
+        """
+        Agregados de trade_history: total, winners, losers, total_pnl, gross_profit,
+        gross_loss, max_dd, today y by_case {caso: [trades, pnl]}.
+        Se mantienen de forma incremental: si el historial solo creció (mismo último trade
+        procesado y mismo día), únicamente se recorren los trades nuevos.
+        """
+        history = self.account.trade_history
+        n = len(history)
+        # closed_at es ISO-8601: comparar el prefijo YYYY-MM-DD evita parsear cada fecha
+        if today is None:
+            today = datetime.now().date().isoformat()
+        
+        cache = self._report_cache
+        start = cache.get('count', 0)
+        if (not cache or cache['today'] != today or n < start
+                or (start and history[start - 1] is not cache['last'])):
+            # Historial reemplazado/recortado o cambio de día: reconstruir desde cero
+            start = 0
+            cache = self._report_cache = {
+                'today': today,
+                'agg': {
+                    'total': 0, 'winners': 0, 'losers': 0,
+                    'total_pnl': 0.0, 'gross_profit': 0.0, 'gross_loss': 0.0,
+                    'max_dd': 0, 'by_case': {1: [0, 0.0], 2: [0, 0.0], 3: [0, 0.0], 4: [0, 0.0]},
+                    'today': 0,
+                },
+                'min_dd': None,
+            }
+        agg = cache['agg']
+        if start == n:
+            return agg
+        
+        winners, losers, today_count = agg['winners'], agg['losers'], agg['today']
+        total_pnl, gross_profit, gross_loss = agg['total_pnl'], agg['gross_profit'], agg['gross_loss']
+        max_dd = cache['min_dd']
+        by_case = agg['by_case']
+        for t in history[start:] if start else history:
+            pnl = t.get('pnl', 0)
+            if pnl > 0:
+                winners += 1
+                gross_profit += pnl
+            elif pnl < 0:
+                losers += 1
+                gross_loss -= pnl
+            total_pnl += pnl
+            
+            case = t.get('strategy_case', 0)
+            if case in by_case:
+                by_case[case][0] += 1
+                by_case[case][1] += pnl
+            
+            min_pnl = t.get('min_pnl', 0)
+            if max_dd is None or min_pnl < max_dd:
+                max_dd = min_pnl
+            
+            if (t.get('closed_at') or '')[:10] == today:
+                today_count += 1
+        
+        agg.update(
+            total=n,
+            winners=winners,
+            losers=losers,
+            total_pnl=total_pnl,
+            gross_profit=gross_profit,
+            gross_loss=gross_loss,
+            max_dd=max_dd if max_dd is not None else 0,
+            today=today_count,
+        )
+        cache['min_dd'] = max_dd
+        cache['count'] = n
+        cache['last'] = history[-1]
+        return agg
+    
+    def _calculate_profit_factor(self, agg: Optional[Dict] = None) -> float:
         if not self.account or not self.account.trade_history:
             return 0.0
-        winners = [t.get('pnl', 0) for t in self.account.trade_history if t.get('pnl', 0) > 0]
-        losers = [t.get('pnl', 0) for t in self.account.trade_history if t.get('pnl', 0) < 0]
-        
-        gross_profit = sum(winners)
-        gross_loss = abs(sum(losers))
+        # Reusar los agregados del llamador: evita otra lectura del reloj y otro _aggregate
+        if agg is None:
+            agg = self._aggregate()
+        gross_profit = agg['gross_profit']
+        gross_loss = agg['gross_loss']
         
         if gross_loss == 0:
             return float('inf') if gross_profit > 0 else 0.0
         return gross_profit / gross_loss
 
-    def _count_today_trades(self) -> int:
-        """Contar trades de hoy"""
-        today = datetime.now().date()
-        count = 0
-        for trade in self.account.trade_history:
-            try:
-                closed_at = trade.get('closed_at', '')
-                if closed_at:
-                    trade_date = datetime.fromisoformat(closed_at).date()
-                    if trade_date == today:
-                        count += 1
-            except:
-                pass
-        return count
-    
     def _format_case(self, case: int) -> str:
         """Formatear número de caso para mostrar"""
-        return f"C{case}" if case else "?"
+        case_str = _CASE_STR.get(case)
+        if case_str is None:
+            case_str = f"C{case}" if case else "?"
+        return case_str
     
     def format_balance(self) -> str:
         """Formato corto solo con balance"""
@@ -228,8 +403,7 @@ class TelegramBot:
             return "⚠️ Bot no inicializado"
         
         # Actualizar PnL con precios actuales
-        if self.price_cache:
-            self.account.update_positions_pnl(self.price_cache)
+        self._refresh_pnl()
         
         status = self.account.get_status()
         return f"""
@@ -245,27 +419,26 @@ class TelegramBot:
             return "⚠️ Bot no inicializado"
         
         # Actualizar PnL con precios actuales
-        if self.price_cache:
-            self.account.update_positions_pnl(self.price_cache)
+        self._refresh_pnl()
         
         if not self.account.open_positions:
             return "📭 Sin posiciones abiertas"
         
-        text = "<b>📂 POSICIONES ABIERTAS</b>\n"
+        parts = ["<b>📂 POSICIONES ABIERTAS</b>\n"]
         for order_id, pos in self.account.open_positions.items():
             current = self.price_cache.get(pos.symbol, pos.current_price)
             pnl = pos.unrealized_pnl
-            emoji = "🟢" if pnl >= 0 else "🔴"
-            
-            text += f"""
+            emoji = _PNL_EMOJI[pnl >= 0]
+
+            parts.append(f"""
 <b>{pos.symbol}</b> (Caso {pos.strategy_case})
 ├ Lado: {pos.side.value if hasattr(pos.side, 'value') else pos.side}
 ├ Entrada: <code>${pos.entry_price:.4f}</code>
 ├ Actual: <code>${current:.4f}</code>
 ├ TP: <code>${pos.take_profit:.4f}</code>
 └ {emoji} PnL: <code>${pnl:.4f}</code>
-"""
-        return text
+""")
+        return "".join(parts)
     
     def format_stats(self) -> str:
         """Formato con estadísticas detalladas"""
@@ -276,25 +449,22 @@ class TelegramBot:
         if not history:
             return "📊 Sin historial de trades"
         
-        total = len(history)
-        winners = [t for t in history if t.get('pnl', 0) > 0]
-        losers = [t for t in history if t.get('pnl', 0) < 0]
+        agg = self._aggregate()
+        total = agg['total']
+        winners = agg['winners']
+        losers = agg['losers']
         
-        win_rate = len(winners) / total * 100 if total > 0 else 0
-        total_pnl = sum(t.get('pnl', 0) for t in history)
-        avg_win = sum(t.get('pnl', 0) for t in winners) / len(winners) if winners else 0
-        avg_loss = sum(t.get('pnl', 0) for t in losers) / len(losers) if losers else 0
-        profit_factor = self._calculate_profit_factor()
+        win_rate = winners / total * 100 if total > 0 else 0
+        total_pnl = agg['total_pnl']
+        avg_win = agg['gross_profit'] / winners if winners else 0
+        avg_loss = -agg['gross_loss'] / losers if losers else 0
+        profit_factor = self._calculate_profit_factor(agg)
         
         # Max drawdown
-        max_dd = min((t.get('min_pnl', 0) for t in history), default=0)
+        max_dd = agg['max_dd']
         
         # Por caso
-        cases = {1: [], 2: [], 3: [], 4: []}
-        for t in history:
-            case = t.get('strategy_case', 0)
-            if case in cases:
-                cases[case].append(t.get('pnl', 0))
+        cases = agg['by_case']
         
         return f"""
 <b>📊 ESTADÍSTICAS DETALLADAS</b>
@@ -302,8 +472,8 @@ class TelegramBot:
 
 <b>📈 GENERAL</b>
 ├ Total Trades: <code>{total}</code>
-├ Ganadores: <code>{len(winners)}</code>
-├ Perdedores: <code>{len(losers)}</code>
+├ Ganadores: <code>{winners}</code>
+├ Perdedores: <code>{losers}</code>
 ├ Win Rate: <code>{win_rate:.1f}%</code>
 └ PnL Total: <code>${total_pnl:.4f}</code>
 
@@ -314,9 +484,9 @@ class TelegramBot:
 └ Max Drawdown: <code>${max_dd:.4f}</code>
 
 <b>🎯 POR CASO</b>
-├ Caso 1: {len(cases[1])} trades | ${sum(cases[1]):.4f}
-├ Caso 3: {len(cases[3])} trades | ${sum(cases[3]):.4f}
-└ Caso 4: {len(cases[4])} trades | ${sum(cases[4]):.4f}
+├ Caso 1: {cases[1][0]} trades | ${cases[1][1]:.4f}
+├ Caso 3: {cases[3][0]} trades | ${cases[3][1]:.4f}
+└ Caso 4: {cases[4][0]} trades | ${cases[4][1]:.4f}
 """
     
     def format_history(self, case_filter: int = None, limit: int = 10) -> str:
@@ -334,23 +504,26 @@ class TelegramBot:
             if not history:
                 return f"📜 Sin operaciones cerradas para Caso {case_filter}"
         
-        # Tomar las últimas N operaciones (más recientes primero)
-        recent = list(reversed(history[-limit:]))
-        
-        header = f"📜 <b>HISTORIAL DE OPERACIONES</b>"
-        if case_filter:
-            header += f" (Caso {case_filter})"
-        header += f"\n<code>━━━━━━━━━━━━━━━━━━━━━━━━</code>\n"
-        header += f"Mostrando últimas {len(recent)} de {len(history)} operaciones\n\n"
+        # Tomar las últimas N operaciones (más recientes primero) con un solo slice invertido
+        recent = history[:-limit - 1:-1] if len(history) > limit else history[::-1]
         
-        lines = []
+        title = f"📜 <b>HISTORIAL DE OPERACIONES</b> (Caso {case_filter})" if case_filter else "📜 <b>HISTORIAL DE OPERACIONES</b>"
+
+        lines = [
+            title,
+            "<code>━━━━━━━━━━━━━━━━━━━━━━━━</code>",
+            f"Mostrando últimas {len(recent)} de {len(history)} operaciones",
+            "",
+        ]
         for t in recent:
             pnl = t.get('pnl', 0)
-            emoji = "🟢" if pnl >= 0 else "🔴"
+            emoji = _PNL_EMOJI[pnl >= 0]
             reason = t.get('reason', '?')
-            reason_emoji = "✅" if reason == 'TP' else "❌"
+            reason_emoji = _REASON_EMOJI[reason == 'TP']
+            case = t.get('strategy_case', 0)
+            case_str = self._format_case(case)
             
-            lines.append(f"{emoji} <b>{t.get('symbol', '?')}</b> ({self._format_case(t.get('strategy_case', 0))})")
+            lines.append(f"{emoji} <b>{t.get('symbol', '?')}</b> ({case_str})")
             lines.append(f"   {reason_emoji} {reason} | PnL: <code>${pnl:.4f}</code>")
             lines.append(f"   📊 Entry: ${t.get('entry_price', 0):.4f} → Close: ${t.get('close_price', 0):.4f}")
             lines.append(f"   🎯 TP: ${t.get('take_profit', 0):.4f} | SL: ${t.get('stop_loss', 0):.4f}")
@@ -366,10 +539,10 @@ class TelegramBot:
         total_pnl = sum(t.get('pnl', 0) for t in history)
         winners = sum(1 for t in history if t.get('pnl', 0) > 0)
         
-        summary = f"<code>━━━━━━━━━━━━━━━━━━━━━━━━</code>\n"
-        summary += f"📈 Total PnL: <code>${total_pnl:.4f}</code> | Win Rate: {winners}/{len(history)}"
-        
-        return header + "\n".join(lines) + summary
+        summary = ("<code>━━━━━━━━━━━━━━━━━━━━━━━━</code>\n"
+                   f"📈 Total PnL: <code>${total_pnl:.4f}</code> | Win Rate: {winners}/{len(history)}")
+
+        return "\n".join(lines) + summary
     
     async def handle_command(self, chat_id: int, command: str, args: List[str]):
         """Procesar comandos"""
@@ -380,7 +553,7 @@ class TelegramBot:
             if command == "/start":
                 if chat_id not in AUTHORIZED_CHATS:
                     AUTHORIZED_CHATS.add(chat_id)
-                    save_authorized_chats()
+                    self.mark_chats_dirty()
                     logger.info(f"Nuevo chat autorizado: {chat_id}")
                 
                 await self.send_message(chat_id, """
@@ -419,6 +592,7 @@ Tu chat ha sido registrado para recibir notificaciones.
             elif command == "/stop":
                 await self.broadcast_message("🛑 <b>BOT DETENIDO</b>\nEl sistema se está apagando por comando remoto.")
                 await asyncio.sleep(1)
+                self.flush_chats()  # os._exit no ejecuta atexit
                 os._exit(0)
                 
             elif command == "/help":
@@ -450,38 +624,43 @@ Tu chat ha sido registrado para recibir notificaciones.
         params = {"offset": -1} # Pedir solo el último
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params, timeout=10) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data.get("ok") and data.get("result"):
-                            last_update = data["result"][0]
-                            self.last_update_id = last_update["update_id"]
-                            logger.info(f"Updates flusheadas. Iniciando desde ID: {self.last_update_id}")
+            session = await self._get_session()
+            async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=10)) as response:
+                if response.status == 200:
+                    data = _json_loads(await response.read())
+                    if data.get("ok") and data.get("result"):
+                        last_update = data["result"][0]
+                        self.last_update_id = last_update["update_id"]
+                        logger.info(f"Updates flusheadas. Iniciando desde ID: {self.last_update_id}")
         except Exception as e:
             logger.error(f"Error flusheando updates: {e}")
 
-    async def poll_updates(self):
-        """Obtener actualizaciones de Telegram (polling)"""
+    async def poll_updates(self) -> bool:
+        """Obtener actualizaciones de Telegram (long polling). Retorna False si hubo error"""
         url = f"{self.api_url}/getUpdates"
         params = {
             "offset": self.last_update_id + 1,
-            "timeout": 30
+            "timeout": 30,
+            "allowed_updates": '["message"]'  # Solo mensajes (process_update ignora el resto)
         }
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params, timeout=35) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data.get("ok"):
-                            for update in data.get("result", []):
-                                self.last_update_id = update["update_id"]
-                                await self.process_update(update)
+            session = await self._get_session()
+            # Long polling: el servidor retiene la respuesta hasta 30s
+            async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=35)) as response:
+                if response.status == 200:
+                    data = _json_loads(await response.read())
+                    if data.get("ok"):
+                        for update in data.get("result", []):
+                            self.last_update_id = update["update_id"]
+                            await self.process_update(update)
+                        return True
+                return False
         except asyncio.TimeoutError:
-            pass  # Normal en long polling
+            return True  # Normal en long polling
         except Exception as e:
             logger.error(f"Error en polling: {e}")
+            return False
     
     async def process_update(self, update: dict):
         """Procesar una actualización de Telegram"""
@@ -493,7 +672,7 @@ Tu chat ha sido registrado para recibir notificaciones.
             # Auto-autorizar cualquier chat que envíe comandos
             if text.startswith("/") and chat_id not in AUTHORIZED_CHATS:
                 AUTHORIZED_CHATS.add(chat_id)
-                save_authorized_chats()
+                self.mark_chats_dirty()
                 logger.info(f"Chat auto-autorizado: {chat_id}")
             
             if text.startswith("/"):
@@ -505,35 +684,17 @@ Tu chat ha sido registrado para recibir notificaciones.
     async def send_trade_alert(self, action: str, symbol: str, side: str, 
                                 price: float, pnl: float = None, case: int = None):
         """Enviar alerta de trade a todos los chats"""
-        emoji = "🟢" if action == "OPEN" else ("💰" if pnl and pnl > 0 else "📉")
-        
-        if action == "OPEN":
-            text = f"""
-{emoji} <b>NUEVA POSICIÓN</b>
-
-📊 {symbol} (Caso {case})
-├ Lado: {side}
-└ Entrada: <code>${price:.4f}</code>
-"""
-        elif action == "CLOSE":
-            pnl_emoji = "🟢" if pnl >= 0 else "🔴"
-            text = f"""
-{emoji} <b>POSICIÓN CERRADA</b>
-
-📊 {symbol}
-├ Precio: <code>${price:.4f}</code>
-└ {pnl_emoji} PnL: <code>${pnl:.4f}</code>
-"""
-        elif action == "LIMIT_FILLED":
-            text = f"""
-⚡ <b>ORDEN LÍMITE EJECUTADA</b>
-
-📊 {symbol} (Caso {case})
-├ Lado: {side}
-└ Precio: <code>${price:.4f}</code>
-"""
+        template = _ALERT_TEMPLATES.get(action)
+        if action == "CLOSE":
+            text = template.format(emoji="💰" if pnl and pnl > 0 else "📉", symbol=symbol,
+                                   price=price, pnl=pnl, pnl_emoji=_PNL_EMOJI[pnl >= 0])
+        elif template is not None:
+            text = template.format(symbol=symbol, case=case, side=side, price=price)
         else:
-            text = f"{emoji} {action}: {symbol} @ ${price:.4f}"
+            emoji = "🟢" if action == "OPEN" else ("💰" if pnl and pnl > 0 else "📉")
+            # Texto plano sin marcado HTML
+            await self.broadcast_message(f"{emoji} {action}: {symbol} @ ${price:.4f}", parse_mode=None)
+            return
         
         await self.broadcast_message(text)
     
@@ -545,10 +706,21 @@ Tu chat ha sido registrado para recibir notificaciones.
         # 1. Ignorar mensajes antiguos del historial de Telegram
         await self.flush_updates()
         
-        # 2. Iniciar loop de escucha
+        # 2. Guardado periódico de chats autorizados
+        flush_task = asyncio.create_task(self._flush_chats_loop())
+        
+        # 3. Iniciar loop de escucha
+        # El long polling (timeout=30) ya marca el ritmo; tras errores, backoff 1→2→4→...→30s
+        backoff = 0
         while self.running:
-            await self.poll_updates()
-            await asyncio.sleep(1)
+            if await self.poll_updates():
+                backoff = 0
+            else:
+                backoff = min(max(backoff * 2, 1), 30)
+                await asyncio.sleep(backoff)
+        
+        flush_task.cancel()
+        self.flush_chats()
         
         # Mensaje de cierre
         if AUTHORIZED_CHATS:
@@ -585,6 +757,7 @@ Tu chat ha sido registrado para recibir notificaciones.
     def stop(self):
         """Detener el bot"""
         self.running = False
+        self.flush_chats()
         logger.info("Bot de Telegram detenido")
 
 
@@ -7,10 +7,20 @@ import aiohttp
 import os
 import json
 import logging
-from datetime import datetime
-from typing import Dict, List, Optional
+import time
+from typing import Dict, List, NamedTuple, Optional
 from dotenv import load_dotenv
 
+try:
+    import orjson  # Opcional: parseo/serialización JSON más rápidos
+    _json_loads = orjson.loads
+    _json_dumps_bytes = orjson.dumps
+except ImportError:
+    _json_loads = json.loads
+    
+    def _json_dumps_bytes(obj) -> bytes:
+        return json.dumps(obj).encode()
+
 # Configuración básica de logging
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -22,76 +32,224 @@ logger = logging.getLogger("MultiBotTelegram")
 load_dotenv()
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 CHATS_FILE = "telegram_chats.json"
+OFFSET_FILE = "last_offset.json"
+STATUS_TTL = 1.0  # segundos que se reutiliza el estado leído de un bot
+
+class BotConfig(NamedTuple):
+    name: str
+    file: str
+    emoji: str
+
+
+class BotStatus(NamedTuple):
+    """Estado resumido de un bot leído de su JSON (error != None si no se pudo leer)"""
+    balance: float = 0.0
+    pnl_float: float = 0.0
+    margin_used: float = 0.0
+    available_margin: float = 0.0
+    open_count: int = 0
+    order_count: int = 0
+    error: Optional[str] = None
+
+
+MAX_MESSAGE_LEN = 4000  # margen bajo el límite de 4096 caracteres de Telegram
+
+
+def _split_message(text: str, limit: int = MAX_MESSAGE_LEN) -> list:
+    """Partir un texto largo en trozos <= limit, cortando en saltos de línea"""
+    chunks = []
+    current = []
+    size = 0
+    for line in text.split("\n"):
+        # Una línea sola más larga que el límite se corta a la fuerza
+        while len(line) > limit:
+            if current:
+                chunks.append("\n".join(current))
+                current, size = [], 0
+            chunks.append(line[:limit])
+            line = line[limit:]
+        if current and size + 1 + len(line) > limit:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+        size += len(line) + (1 if current else 0)
+        current.append(line)
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+# Plantillas del bloque por bot en /report (se formatean con una sola llamada)
+REPORT_BOT_TMPL = (
+    "\n{emoji} <b>{name}</b>"
+    "\n├ Balance: <code>${balance:.2f}</code> {trend}"
+    "\n├ PnL Flotante: <code>${pnl:.4f}</code> {pnl_emoji}"
+    "\n├ Balance Margin: <code>${mb:.2f}</code>"
+    "\n├ Ops Activas: <b>{open}</b> (+{pend} pend)"
+    "\n└ Margen Disp.: <code>${av:.2f}</code>\n"
+)
+REPORT_BOT_ERROR_TMPL = "\n{emoji} <b>{name}</b>\n└ ⚠️ {error}\n"
 
 # Configuración de los bots a monitorear
-BOTS_CONFIG = [
-    {"name": "Bot REAL", "file": "trades_real.json", "emoji": "🔴"},
-    {"name": "Bot 2H", "file": "trades_V2_2h.json", "emoji": "🕑"}
-]
+BOTS_CONFIG = (
+    BotConfig(name="Bot REAL", file="trades_real.json", emoji="🔴"),
+    BotConfig(name="Bot 2H", file="trades_V2_2h.json", emoji="🕑"),
+)
 
 class MultiTelegramBot:
     def __init__(self, token):
         self.token = token
         self.api_url = f"https://api.telegram.org/bot{token}"
-        self.last_update_id = 0
-        self.running = False
+        self.last_update_id = self._load_offset()
         self.running = False
         self.authorized_chats = self._load_chats()
-        self.startup_time = int(datetime.now().timestamp())
+        self.startup_time = int(time.time())
+        # Sesión HTTP persistente hacia api.telegram.org (reutiliza TCP/TLS entre llamadas)
+        self._session: Optional[aiohttp.ClientSession] = None
+        # Estado por archivo: {path: ((mtime_ns, size), status)} para no re-parsear JSON sin cambios
+        self._status_cache: Dict[str, tuple] = {}
+        # Memo corto {path: (expira_monotonic, status)} por encima del caché por mtime
+        self._status_memo: Dict[str, tuple] = {}
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Obtener la sesión HTTP compartida (se crea de forma perezosa)"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=20, ttl_dns_cache=300, keepalive_timeout=75)
+            )
+        return self._session
         
     def _load_chats(self) -> set:
-        if os.path.exists(CHATS_FILE):
-            try:
-                with open(CHATS_FILE, 'r') as f:
-                    return set(json.load(f))
-            except Exception:
-                return set()
-        return set()
+        # Abrir directamente (sin os.path.exists previo): una syscall menos y sin carrera
+        try:
+            with open(CHATS_FILE, 'rb') as f:
+                return set(_json_loads(f.read()))
+        except Exception:
+            return set()
+
+    def _load_offset(self) -> int:
+        """Último update_id procesado (persistido) para reanudar sin repetir comandos"""
+        try:
+            with open(OFFSET_FILE, 'rb') as f:
+                return int(_json_loads(f.read()).get("last_update_id", 0))
+        except Exception:
+            return 0
+
+    def _save_offset(self):
+        try:
+            with open(OFFSET_FILE, 'wb') as f:
+                f.write(_json_dumps_bytes({"last_update_id": self.last_update_id}))
+        except Exception as e:
+            logger.error(f"Error guardando offset: {e}")
 
     def _save_chats(self):
         try:
-            with open(CHATS_FILE, 'w') as f:
-                json.dump(list(self.authorized_chats), f)
+            with open(CHATS_FILE, 'wb') as f:
+                f.write(_json_dumps_bytes(list(self.authorized_chats)))
         except Exception as e:
             logger.error(f"Error guardando chats: {e}")
 
     async def send_message(self, chat_id: int, text: str, parse_mode: str = "HTML") -> bool:
+        if len(text) <= MAX_MESSAGE_LEN:
+            return await self._send_text(chat_id, text, parse_mode)
+        
+        # Telegram rechaza (400) textos > 4096: partir en saltos de línea y enviar en orden
+        ok = False
+        for i, chunk in enumerate(_split_message(text)):
+            if i:
+                await asyncio.sleep(0.05)
+            ok = await self._send_text(chat_id, chunk, parse_mode) or ok
+        return ok
+
+    async def _send_text(self, chat_id: int, text: str, parse_mode: str) -> bool:
         url = f"{self.api_url}/sendMessage"
         payload = {"chat_id": chat_id, "text": text, "parse_mode": parse_mode}
         try:
-            async with aiohttp.ClientSession() as session:
+            session = await self._get_session()
+            for attempt in range(2):
                 async with session.post(url, json=payload) as response:
-                    return response.status == 200
+                    if response.status != 429 or attempt:
+                        return response.status == 200
+                    # Flood limit de Telegram: esperar lo que indique retry_after y reintentar una vez
+                    data = await response.json()
+                    retry_after = data.get("parameters", {}).get("retry_after", 1)
+                logger.warning(f"Rate limit de Telegram, reintentando en {retry_after}s")
+                await asyncio.sleep(retry_after)
         except Exception as e:
             logger.error(f"Error enviando mensaje: {e}")
             return False
 
+    async def broadcast(self, text: str):
+        """Enviar a todos los chats en paralelo (máx. 5 envíos simultáneos)"""
+        sem = asyncio.Semaphore(5)
+        
+        async def _one(chat_id):
+            async with sem:
+                await self.send_message(chat_id, text)
+                await asyncio.sleep(0.05)
+        
+        await asyncio.gather(*(_one(chat_id) for chat_id in tuple(self.authorized_chats)),
+                             return_exceptions=True)
+
     async def send_document(self, chat_id: int, file_path: str, caption: str = "") -> bool:
         url = f"{self.api_url}/sendDocument"
-        if not os.path.exists(file_path):
+        try:
+            # Abrir fuera del event loop; aiohttp sube el archivo por bloques leídos en
+            # el executor, sin cargarlo entero en memoria
+            f = await asyncio.to_thread(open, file_path, 'rb')
+        except FileNotFoundError:
             await self.send_message(chat_id, f"⚠️ No encontrado: {file_path}")
             return False
             
         try:
-            data = aiohttp.FormData()
-            data.add_field('chat_id', str(chat_id))
-            data.add_field('caption', caption)
-            data.add_field('document', open(file_path, 'rb'), filename=os.path.basename(file_path))
-            async with aiohttp.ClientSession() as session:
+            with f:
+                data = aiohttp.FormData()
+                data.add_field('chat_id', str(chat_id))
+                data.add_field('caption', caption)
+                data.add_field('document', f, filename=os.path.basename(file_path))
+                session = await self._get_session()
                 async with session.post(url, data=data) as response:
                     return response.status == 200
         except Exception as e:
             logger.error(f"Error enviando documento: {e}")
             return False
 
-    def get_bot_status(self, file_path, name):
-        """Lee el JSON y extrae el estado actual"""
-        if not os.path.exists(file_path):
-            return {"error": "Esperando datos..."}
+    def get_bot_status(self, file_path, name) -> BotStatus:
+        """Lee el JSON y extrae el estado actual (cacheado por mtime y tamaño del archivo)"""
+        # Ráfagas de /report: reutilizar el último estado durante STATUS_TTL sin tocar el disco
+        now = time.monotonic()
+        memo = self._status_memo.get(file_path)
+        if memo and now < memo[0]:
+            return memo[1]
+        status = self._read_bot_status(file_path)
+        self._status_memo[file_path] = (now + STATUS_TTL, status)
+        return status
+
+    def _read_bot_status(self, file_path) -> BotStatus:
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            st = None
         
+        # Preferir el resumen <archivo>.state.json (sin historial) si está al día con el completo
+        state_path = os.path.splitext(file_path)[0] + ".state.json"
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            st_state = os.stat(state_path)
+            if st is None or st_state.st_mtime_ns >= st.st_mtime_ns:
+                file_path, st = state_path, st_state
+        except OSError:
+            pass
+        
+        if st is None:
+            return BotStatus(error="Esperando datos...")
+        
+        key = (st.st_mtime_ns, st.st_size)
+        cached = self._status_cache.get(file_path)
+        if cached and cached[0] == key:
+            return cached[1]
+        
+        try:
+            with open(file_path, 'rb') as f:
+                data = _json_loads(f.read())
                 
             balance = data.get("balance", 0)
             initial_balance = data.get("initial_balance", 30.0) # Default
@@ -121,49 +279,58 @@ class MultiTelegramBot:
                 
             available_margin = balance - margin_used - pending_margin
             
-            return {
-                "balance": balance,
-                "pnl_float": pnl_float,
-                "margin_used": margin_used + pending_margin,
-                "available_margin": available_margin,
-                "open_count": len(open_positions),
-                "order_count": len(data.get("pending_orders", {}))
-            }
+            status = BotStatus(
+                balance=balance,
+                pnl_float=pnl_float,
+                margin_used=margin_used + pending_margin,
+                available_margin=available_margin,
+                open_count=len(open_positions),
+                order_count=len(data.get("pending_orders", {}))
+            )
+            self._status_cache[file_path] = (key, status)
+            return status
+        except FileNotFoundError:
+            # Borrado/rotado entre el stat y el open
+            return BotStatus(error="Esperando datos...")
         except Exception as e:
-            return {"error": str(e)}
+            return BotStatus(error=str(e))
 
-    def generate_report(self):
-        now = datetime.now().strftime("%H:%M:%S")
-        report = f"🤖 <b>REPORTE MULTI-BOT</b>\n📅 {now}\n"
+    async def generate_report(self):
+        now = time.strftime("%H:%M:%S")
+        parts = [f"🤖 <b>REPORTE MULTI-BOT</b>\n📅 {now}\n"]
         
-        for bot in BOTS_CONFIG:
-            status = self.get_bot_status(bot["file"], bot["name"])
-            report += f"\n{bot['emoji']} <b>{bot['name']}</b>"
-            
-            if "error" in status:
-                report += f"\n└ ⚠️ {status['error']}\n"
+        # Leer/parsear los JSON de todos los bots en paralelo (fuera del event loop)
+        statuses = await asyncio.gather(
+            *(asyncio.to_thread(self.get_bot_status, bot.file, bot.name) for bot in BOTS_CONFIG)
+        )
+        
+        for bot, status in zip(BOTS_CONFIG, statuses):
+            if status.error is not None:
+                parts.append(REPORT_BOT_ERROR_TMPL.format(emoji=bot.emoji, name=bot.name, error=status.error))
                 continue
                 
-            pnl = status['pnl_float']
-            pnl_emoji = "🟢" if pnl >= 0 else "🔴"
-            balance_trend = "📈"  # Simplificado
+            pnl = status.pnl_float
             
             # Calcular margin_balance usando los valores redondeados para asegurar consistencia visual
             # Esto evita reportes donde Balance + PnL != Margin por diferencias de decimales ocultos
-            balance_display = status['balance']
-            pnl_display = pnl
+            # (misma precisión que se muestra en el mensaje: .2f y .4f)
+            margin_balance = round(status.balance, 2) + round(pnl, 4)
             
-            # Usar la misma precisión que se muestra en el mensaje (.2f y .4f)
-            margin_balance = round(balance_display, 2) + round(pnl_display, 4)
+            parts.append(REPORT_BOT_TMPL.format_map({
+                "emoji": bot.emoji,
+                "name": bot.name,
+                "balance": status.balance,
+                "trend": "📈",  # Simplificado
+                "pnl": pnl,
+                "pnl_emoji": "🟢" if pnl >= 0 else "🔴",
+                "mb": margin_balance,
+                "open": status.open_count,
+                "pend": status.order_count,
+                "av": status.available_margin,
+            }))
             
-            report += f"\n├ Balance: <code>${status['balance']:.2f}</code> {balance_trend}"
-            report += f"\n├ PnL Flotante: <code>${pnl:.4f}</code> {pnl_emoji}"
-            report += f"\n├ Balance Margin: <code>${margin_balance:.2f}</code>"
-            report += f"\n├ Ops Activas: <b>{status['open_count']}</b> (+{status['order_count']} pend)"
-            report += f"\n└ Margen Disp.: <code>${status['available_margin']:.2f}</code>\n"
-            
-        report += "\n💡 /files para descargar los JSON"
-        return report
+        parts.append("\n💡 /files para descargar los JSON")
+        return "".join(parts)
 
     async def handle_command(self, chat_id, text):
         command = text.split()[0].lower()
@@ -174,11 +341,13 @@ class MultiTelegramBot:
             await self.send_message(chat_id, "✅ <b>Multi-Bot Monitor Iniciado</b>\nRecibirás reportes periódicos.")
             
         elif command in ["/report", "/balance"]:
-            await self.send_message(chat_id, self.generate_report())
+            await self.send_message(chat_id, await self.generate_report())
             
         elif command == "/files":
-            for bot in BOTS_CONFIG:
-                await self.send_document(chat_id, bot["file"], caption=f"📂 {bot['name']}")
+            # Subidas en paralelo sobre la sesión compartida
+            await asyncio.gather(
+                *(self.send_document(chat_id, bot.file, caption=f"📂 {bot.name}") for bot in BOTS_CONFIG)
+            )
                 
         elif command == "/help":
             await self.send_message(chat_id, "Comandos:\n/report - Ver estado\n/files - Descargar JSONs\n/stop - Detener todos los bots")
@@ -195,35 +364,45 @@ class MultiTelegramBot:
             try:
                 url = f"{self.api_url}/getUpdates"
                 params = {"offset": self.last_update_id + 1, "timeout": 30}
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(url, params=params) as resp:
-                        if resp.status == 200:
-                            data = await resp.json()
-                            for update in data.get("result", []):
-                                self.last_update_id = update["update_id"]
-                                if "message" in update:
-                                    msg = update["message"]
-                                    # Ignorar mensajes viejos (anteriores al inicio del bot)
-                                    # Usamos una ventana de seguridad de 10 segundos
-                                    if "date" in msg and msg["date"] < (self.startup_time - 10):
-                                        logger.info(f"Ignorando mensaje viejo ID {update['update_id']}")
-                                        continue
-                                        
-                                    if "text" in msg:
-                                        await self.handle_command(msg["chat"]["id"], msg["text"])
+                session = await self._get_session()
+                async with session.get(url, params=params) as resp:
+                    if resp.status == 200:
+                        data = await resp.json()
+                        updates = data.get("result", [])
+                        # Ignorar mensajes viejos (anteriores al inicio del bot)
+                        # Usamos una ventana de seguridad de 10 segundos
+                        cutoff = self.startup_time - 10
+                        for update in updates:
+                            self.last_update_id = update["update_id"]
+                            if "message" in update:
+                                msg = update["message"]
+                                if "date" in msg and msg["date"] < cutoff:
+                                    logger.info(f"Ignorando mensaje viejo ID {update['update_id']}")
+                                    continue
+                                    
+                                if "text" in msg:
+                                    await self.handle_command(msg["chat"]["id"], msg["text"])
+                        # Lote completo procesado: persistir offset para que un reinicio no lo repita
+                        if updates:
+                            self._save_offset()
+                    else:
+                        logger.error(f"Error polling: HTTP {resp.status}")
+                        await asyncio.sleep(5)
             except Exception as e:
                 logger.error(f"Error polling: {e}")
                 await asyncio.sleep(5)
-            await asyncio.sleep(1)
+            # Sin pausa en el caso normal: el long polling (timeout=30) ya marca el ritmo
 
     async def report_loop(self):
         logger.info("Iniciando loop de reportes (20 min)...")
         while self.running:
+            # Sin chats no hay a quién reportar: revisar cada minuto sin esperar el ciclo completo
+            if not self.authorized_chats:
+                await asyncio.sleep(60)
+                continue
             await asyncio.sleep(20 * 60) # 20 minutos
             if self.authorized_chats:
-                report = self.generate_report()
-                for chat_id in self.authorized_chats:
-                    await self.send_message(chat_id, report)
+                await self.broadcast(await self.generate_report())
 
     async def run(self):
         self.running = True
@@ -231,18 +410,28 @@ class MultiTelegramBot:
         
         # Notificar inicio
         if self.authorized_chats:
-            for chat in self.authorized_chats:
-                await self.send_message(chat, "🚀 <b>MONITOR MULTI-BOT INICIADO</b>")
+            await self.broadcast("🚀 <b>MONITOR MULTI-BOT INICIADO</b>")
         
-        await asyncio.gather(self.poll_loop(), self.report_loop())
+        try:
+            await asyncio.gather(self.poll_loop(), self.report_loop())
+        finally:
+            if self._session is not None and not self._session.closed:
+                await self._session.close()
 
 if __name__ == "__main__":
     if not TELEGRAM_TOKEN:
         print("❌ TELEGRAM_TOKEN no configurado en .env")
         exit(1)
         
+    # uvloop (libuv) si está disponible; en Windows no existe y se usa el loop por defecto
+    try:
+        import uvloop
+        run_loop = uvloop.run
+    except ImportError:
+        run_loop = asyncio.run
+    
     bot = MultiTelegramBot(TELEGRAM_TOKEN)
     try:
-        asyncio.run(bot.run())
+        run_loop(bot.run())
     except KeyboardInterrupt:
         print("\n👋 Bot detenido")
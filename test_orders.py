@@ -3,8 +3,15 @@ Test script para colocar órdenes en Bybit Demo Trading
 Prueba: WLDUSDT - Market y Limit orders
 """
 import os
+import hmac
+import json
+import time
+import asyncio
+import hashlib
+from urllib.parse import urlencode
+
+import aiohttp
 from dotenv import load_dotenv
-from pybit.unified_trading import HTTP
 
 load_dotenv()
 
@@ -14,168 +21,203 @@ API_SECRET = os.getenv("BYBIT_DEMO_API_SECRET")
 SYMBOL = "WLDUSDT"
 LEVERAGE = 50
 
-# Conectar a Bybit Demo
-session = HTTP(
-    demo=True,
-    api_key=API_KEY,
-    api_secret=API_SECRET
-)
+# Bybit Demo (API v5)
+BASE_URL = "https://api-demo.bybit.com"
+RECV_WINDOW = "5000"
+
+
+def _sign_headers(payload: str) -> dict:
+    """Cabeceras de autenticación v5: HMAC-SHA256(timestamp + key + recv_window + payload)"""
+    timestamp = str(int(time.time() * 1000))
+    signature = hmac.new(
+        API_SECRET.encode(), (timestamp + API_KEY + RECV_WINDOW + payload).encode(), hashlib.sha256
+    ).hexdigest()
+    return {
+        "X-BAPI-API-KEY": API_KEY,
+        "X-BAPI-TIMESTAMP": timestamp,
+        "X-BAPI-RECV-WINDOW": RECV_WINDOW,
+        "X-BAPI-SIGN": signature,
+        "Content-Type": "application/json",
+    }
+
+
+async def signed_get(session: aiohttp.ClientSession, path: str, params: dict) -> dict:
+    """GET firmado (la firma cubre el query string)"""
+    query = urlencode(params)
+    async with session.get(f"{path}?{query}", headers=_sign_headers(query)) as resp:
+        return await resp.json()
 
-def set_leverage():
+
+async def signed_post(session: aiohttp.ClientSession, path: str, params: dict) -> dict:
+    """POST firmado (la firma cubre el cuerpo JSON exacto que se envía)"""
+    body = json.dumps(params)
+    async with session.post(path, data=body, headers=_sign_headers(body)) as resp:
+        return await resp.json()
+
+
+async def set_leverage(session):
     """Configurar leverage"""
     try:
-        session.set_leverage(
-            category="linear",
-            symbol=SYMBOL,
-            buyLeverage=str(LEVERAGE),
-            sellLeverage=str(LEVERAGE)
-        )
-        print(f"✅ Leverage configurado a {LEVERAGE}x")
+        result = await signed_post(session, "/v5/position/set-leverage", {
+            "category": "linear",
+            "symbol": SYMBOL,
+            "buyLeverage": str(LEVERAGE),
+            "sellLeverage": str(LEVERAGE)
+        })
+        if result.get("retCode") == 0:
+            print(f"✅ Leverage configurado a {LEVERAGE}x")
+        else:
+            print(f"⚠️ Leverage ya configurado o error: {result.get('retMsg')}")
     except Exception as e:
         print(f"⚠️ Leverage ya configurado o error: {e}")
 
-def get_current_price():
+async def get_current_price(session):
     """Obtener precio actual"""
-    result = session.get_tickers(category="linear", symbol=SYMBOL)
+    async with session.get("/v5/market/tickers", params={"category": "linear", "symbol": SYMBOL}) as resp:
+        result = await resp.json()
     if result.get("retCode") == 0:
-        price = float(result['result']['list'][0]['lastPrice'])
-        print(f"📊 Precio actual de {SYMBOL}: ${price}")
-        return price
+        return float(result['result']['list'][0]['lastPrice'])
     return None
 
-def place_market_order():
+async def place_market_order(session):
     """Colocar orden market de venta"""
-    print("\n" + "="*50)
-    print("🔴 TEST 1: MARKET ORDER")
-    print("="*50)
-    
-    current_price = get_current_price()
-    if not current_price:
-        print("❌ No se pudo obtener precio")
-        return
-    
-    # TP/SL al 5% del precio
-    tp_price = round(current_price * 0.95, 4)  # 5% abajo (ganancia para short)
-    sl_price = round(current_price * 1.05, 4)  # 5% arriba (pérdida para short)
-    
-    # Cantidad mínima para $5 de valor nocional
-    min_qty = max(12, int(6 / current_price) + 1)  # Al menos $5 de valor
-    qty = min_qty
-    
-    print(f"   Qty: {qty}")
-    print(f"   TP: ${tp_price} (-5%)")
-    print(f"   SL: ${sl_price} (+5%)")
-    
+    # Las dos órdenes corren en paralelo: acumular la salida y mostrarla de una vez
+    out = ["\n" + "="*50, "🔴 TEST 1: MARKET ORDER", "="*50]
+
     try:
-        result = session.place_order(
-            category="linear",
-            symbol=SYMBOL,
-            side="Sell",
-            orderType="Market",
-            qty=str(qty),
-            takeProfit=str(tp_price),
-            stopLoss=str(sl_price),
-            tpTriggerBy="LastPrice",
-            slTriggerBy="LastPrice",
-            tpOrderType="Limit",
-            tpLimitPrice=str(tp_price),
-            slOrderType="Limit",
-            slLimitPrice=str(sl_price),
-            tpslMode="Partial",
-            positionIdx=0
-        )
-        
+        current_price = await get_current_price(session)
+        if not current_price:
+            out.append("❌ No se pudo obtener precio")
+            return
+        out.append(f"📊 Precio actual de {SYMBOL}: ${current_price}")
+
+        # TP/SL al 5% del precio
+        tp_price = round(current_price * 0.95, 4)  # 5% abajo (ganancia para short)
+        sl_price = round(current_price * 1.05, 4)  # 5% arriba (pérdida para short)
+
+        # Cantidad mínima para $5 de valor nocional
+        min_qty = max(12, int(6 / current_price) + 1)  # Al menos $5 de valor
+        qty = min_qty
+
+        out.append(f"   Qty: {qty}")
+        out.append(f"   TP: ${tp_price} (-5%)")
+        out.append(f"   SL: ${sl_price} (+5%)")
+
+        result = await signed_post(session, "/v5/order/create", {
+            "category": "linear",
+            "symbol": SYMBOL,
+            "side": "Sell",
+            "orderType": "Market",
+            "qty": str(qty),
+            "takeProfit": str(tp_price),
+            "stopLoss": str(sl_price),
+            "tpTriggerBy": "LastPrice",
+            "slTriggerBy": "LastPrice",
+            "tpOrderType": "Limit",
+            "tpLimitPrice": str(tp_price),
+            "slOrderType": "Limit",
+            "slLimitPrice": str(sl_price),
+            "tpslMode": "Partial",
+            "positionIdx": 0
+        })
+
         if result.get("retCode") == 0:
             order_id = result['result']['orderId']
-            print(f"✅ MARKET ORDER EXITOSA!")
-            print(f"   Order ID: {order_id}")
+            out.append(f"✅ MARKET ORDER EXITOSA!")
+            out.append(f"   Order ID: {order_id}")
         else:
-            print(f"❌ Error: {result.get('retMsg')}")
-            
+            out.append(f"❌ Error: {result.get('retMsg')}")
+
     except Exception as e:
-        print(f"❌ Exception: {e}")
+        out.append(f"❌ Exception: {e}")
+    finally:
+        print("\n".join(out))
 
-def place_limit_order():
+async def place_limit_order(session):
     """Colocar orden limit de venta a $0.5"""
-    print("\n" + "="*50)
-    print("📝 TEST 2: LIMIT ORDER @ $0.50")
-    print("="*50)
-    
+    out = ["\n" + "="*50, "📝 TEST 2: LIMIT ORDER @ $0.50", "="*50]
+
     limit_price = 0.50
-    
+
     # TP/SL al 5% del precio límite
     tp_price = round(limit_price * 0.95, 4)  # 5% abajo
     sl_price = round(limit_price * 1.05, 4)  # 5% arriba
-    
+
     # Cantidad mínima para $5 de valor nocional
     qty = max(12, int(6 / limit_price) + 1)
-    
-    print(f"   Precio Límite: ${limit_price}")
-    print(f"   Qty: {qty}")
-    print(f"   TP: ${tp_price} (-5%)")
-    print(f"   SL: ${sl_price} (+5%)")
-    
+
+    out.append(f"   Precio Límite: ${limit_price}")
+    out.append(f"   Qty: {qty}")
+    out.append(f"   TP: ${tp_price} (-5%)")
+    out.append(f"   SL: ${sl_price} (+5%)")
+
     try:
-        result = session.place_order(
-            category="linear",
-            symbol=SYMBOL,
-            side="Sell",
-            orderType="Limit",
-            price=str(limit_price),
-            qty=str(qty),
-            takeProfit=str(tp_price),
-            stopLoss=str(sl_price),
-            tpTriggerBy="LastPrice",
-            slTriggerBy="LastPrice",
-            tpOrderType="Limit",
-            tpLimitPrice=str(tp_price),
-            slOrderType="Limit",
-            slLimitPrice=str(sl_price),
-            tpslMode="Partial",
-            positionIdx=0,
-            timeInForce="GTC"
-        )
-        
+        result = await signed_post(session, "/v5/order/create", {
+            "category": "linear",
+            "symbol": SYMBOL,
+            "side": "Sell",
+            "orderType": "Limit",
+            "price": str(limit_price),
+            "qty": str(qty),
+            "takeProfit": str(tp_price),
+            "stopLoss": str(sl_price),
+            "tpTriggerBy": "LastPrice",
+            "slTriggerBy": "LastPrice",
+            "tpOrderType": "Limit",
+            "tpLimitPrice": str(tp_price),
+            "slOrderType": "Limit",
+            "slLimitPrice": str(sl_price),
+            "tpslMode": "Partial",
+            "positionIdx": 0,
+            "timeInForce": "GTC"
+        })
+
         if result.get("retCode") == 0:
             order_id = result['result']['orderId']
-            print(f"✅ LIMIT ORDER EXITOSA!")
-            print(f"   Order ID: {order_id}")
+            out.append(f"✅ LIMIT ORDER EXITOSA!")
+            out.append(f"   Order ID: {order_id}")
         else:
-            print(f"❌ Error: {result.get('retMsg')}")
-            
+            out.append(f"❌ Error: {result.get('retMsg')}")
+
     except Exception as e:
-        print(f"❌ Exception: {e}")
+        out.append(f"❌ Exception: {e}")
+    finally:
+        print("\n".join(out))
 
-def check_balance():
+async def check_balance(session):
     """Ver balance disponible"""
-    print("\n" + "="*50)
-    print("💰 BALANCE ACTUAL")
-    print("="*50)
-    
+    out = ["\n" + "="*50, "💰 BALANCE ACTUAL", "="*50]
+
     try:
-        result = session.get_wallet_balance(accountType="UNIFIED")
+        result = await signed_get(session, "/v5/account/wallet-balance", {"accountType": "UNIFIED"})
         if result.get("retCode") == 0:
             account = result['result']['list'][0]
             available = float(account.get('totalAvailableBalance', 0))
             equity = float(account.get('totalEquity', 0))
-            print(f"   Equity Total: ${equity:.2f}")
-            print(f"   Disponible: ${available:.2f}")
+            out.append(f"   Equity Total: ${equity:.2f}")
+            out.append(f"   Disponible: ${available:.2f}")
     except Exception as e:
-        print(f"❌ Error: {e}")
+        out.append(f"❌ Error: {e}")
+    finally:
+        print("\n".join(out))
 
-if __name__ == "__main__":
+async def main():
     print("\n🚀 BYBIT DEMO TRADING - TEST DE ÓRDENES")
     print("="*50)
-    
-    check_balance()
-    set_leverage()
-    
-    # TEST 1: Market Order
-    place_market_order()
-    
-    # TEST 2: Limit Order
-    place_limit_order()
-    
+
+    # Una sola sesión (pool de conexiones) para todas las llamadas
+    async with aiohttp.ClientSession(
+        base_url=BASE_URL, connector=aiohttp.TCPConnector(limit=10)
+    ) as session:
+        # Balance y leverage son independientes entre sí
+        await asyncio.gather(check_balance(session), set_leverage(session))
+
+        # TEST 1 (Market) y TEST 2 (Limit) en paralelo
+        await asyncio.gather(place_market_order(session), place_limit_order(session))
+
     print("\n" + "="*50)
     print("✅ TEST COMPLETADO")
     print("="*50)
+
+if __name__ == "__main__":
+    asyncio.run(main())
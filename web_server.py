@@ -3,63 +3,359 @@ Servidor web para servir analisis_bot_v3.html y trades.json
 Con actualización en tiempo real y soporte para ngrok
 """
 import http.server
-import socketserver
 import os
 import json
 import threading
+import gzip
 import time
+import shutil
+import email.utils
 from pathlib import Path
-from urllib.parse import urlparse, parse_qs
+from dataclasses import asdict
+from urllib.parse import urlparse, unquote_plus
+from collections import OrderedDict
 import requests
+from requests.adapters import HTTPAdapter
 
 # Importar funciones de fibonacci.py
 from fibonacci import calculate_zigzag, calculate_fibonacci_levels, ZigZagPoint
 
+try:
+    import orjson  # Opcional: (de)serialización JSON más rápida (trabaja con bytes UTF-8 directamente)
+    _json_loads = orjson.loads
+    _json_dumps_bytes = orjson.dumps
+except ImportError:
+    _json_loads = json.loads
+    
+    def _json_dumps_bytes(obj) -> bytes:
+        # orjson serializa dataclasses de forma nativa; json necesita convertirlas
+        return json.dumps(obj, default=asdict).encode('utf-8')
+
+try:
+    import brotli  # Opcional: compresión 'br' (si no está, solo gzip)
+except ImportError:
+    brotli = None
+
 # Configuración
 PORT = int(os.getenv("BOT_WEB_PORT", 8080))
 DIRECTORY = Path(__file__).parent
 
-# Cache para datos de velas
+# Precarga del cache ZigZag justo después de cada cierre de vela: "BTCUSDT:1h,ETHUSDT:4h" (vacío = desactivada)
+WARM_LIST = [
+    (symbol.strip().upper(), tf.strip() or '1h')
+    for symbol, _, tf in (item.partition(':') for item in os.getenv("BOT_WEB_WARM", "").split(','))
+    if symbol.strip()
+]
+WARM_LIMIT = 200  # mismo limit por defecto que /api/zigzag
+WARM_DELAY = 2  # segundos tras el cierre para que Bybit ya tenga la vela nueva
+
+# Timeframes aceptados por /api/zigzag -> intervalo de Bybit
+_TF_MAP = {'1': '1', '5': '5', '15': '15', '60': '60', '240': '240',
+           '1m': '1', '5m': '5', '15m': '15', '1h': '60', '4h': '240'}
+
+# Cabeceras fijas de las respuestas JSON de la API
+_ZIGZAG_HEADERS = (
+    ('Content-type', 'application/json'),
+    ('Access-Control-Allow-Origin', '*'),
+    ('Cache-Control', 'no-cache'),
+    ('Vary', 'Accept-Encoding'),
+)
+_ZIGZAG_HEADER_BLOCK = "".join(f"{name}: {value}\r\n" for name, value in _ZIGZAG_HEADERS).encode('latin-1')
+
+# Sesión HTTP compartida hacia Bybit: el pool de urllib3 mantiene viva la conexión TLS entre peticiones
+_bybit_session = requests.Session()
+_bybit_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0))
+_bybit_session.headers['Accept-Encoding'] = 'gzip'
+
+# Página principal en memoria: solo se vuelve a mirar el disco cada INDEX_RECHECK segundos
+INDEX_FILE = 'analisis_bot_v3.html'
+INDEX_RECHECK = 5
+_index_cache = {'checked': 0.0, 'mtime': None, 'body': None}
+_index_lock = threading.Lock()
+
+
+def _get_index_page():
+    """(bytes, mtime) de la página principal, o None si no existe"""
+    with _index_lock:
+        now = time.time()
+        if now - _index_cache['checked'] >= INDEX_RECHECK:
+            _index_cache['checked'] = now
+            try:
+                path = DIRECTORY / INDEX_FILE
+                mtime = path.stat().st_mtime
+                if mtime != _index_cache['mtime']:
+                    _index_cache['body'] = path.read_bytes()
+                    _index_cache['mtime'] = mtime
+            except OSError:
+                _index_cache['body'] = _index_cache['mtime'] = None
+        if _index_cache['body'] is None:
+            return None
+        return _index_cache['body'], _index_cache['mtime']
+
+
+# JSON servibles: {nombre: Path} de los *.json del directorio, re-escaneado cada JSON_RESCAN segundos
+JSON_RESCAN = 5
+_json_allow = {'checked': 0.0, 'files': {}}
+_json_allow_lock = threading.Lock()
+
+
+def _get_json_path(name: str):
+    """Path del JSON `name` si existe en el directorio del bot (None si no)"""
+    with _json_allow_lock:
+        now = time.time()
+        if now - _json_allow['checked'] >= JSON_RESCAN:
+            _json_allow['checked'] = now
+            _json_allow['files'] = {p.name: p for p in DIRECTORY.glob('*.json')}
+        return _json_allow['files'].get(name)
+
+
+# Cache de respuestas ZigZag: {(symbol, timeframe, limit): (timestamp, payload_bytes, payload_gzip)}
+# Dict ordenado por inserción = FIFO; los hilos del servidor lo comparten, de ahí el lock
 _candle_cache = {}
 _cache_timeout = 60  # segundos
+_CANDLE_CACHE_MAX = 128
+_candle_cache_lock = threading.Lock()
+
+
+def _get_cached_zigzag(key):
+    """(payload, payload_gzip) cacheados para `key` si tienen menos de _cache_timeout segundos"""
+    with _candle_cache_lock:
+        cached = _candle_cache.get(key)
+    if cached and time.time() - cached[0] < _cache_timeout:
+        return cached[1], cached[2]
+    return None
+
+
+def _store_zigzag(key, payload: bytes) -> bytes:
+    """Cachear el payload junto con su versión gzip (nivel 1: casi gratis en CPU); devuelve la gzip"""
+    gz = gzip.compress(payload, compresslevel=1)
+    with _candle_cache_lock:
+        _candle_cache.pop(key, None)
+        if len(_candle_cache) >= _CANDLE_CACHE_MAX:
+            # Expulsar la entrada más antigua
+            _candle_cache.pop(next(iter(_candle_cache)))
+        _candle_cache[key] = (time.time(), payload, gz)
+    return gz
+
+
+# ZigZag ya calculado por conjunto de velas: {(symbol, timeframe, limit, n, last_ts, last_high, last_low): payload}
+# Las velas cerradas no cambian; la vela en curso sí (high/low), por eso va en la clave. LRU con tope.
+_zigzag_result_cache = OrderedDict()
+_ZIGZAG_RESULT_CACHE_MAX = 256
+
+# Consultas ZigZag en curso: {key: threading.Event} para que peticiones simultáneas esperen a una sola
+_zigzag_inflight = {}
+
+
+def _build_zigzag_payload(symbol: str, timeframe: str, limit: int) -> bytes:
+    """Descargar velas de Bybit, calcular el ZigZag y devolver el JSON serializado"""
+    bybit_tf = _TF_MAP.get(timeframe, '60')
+
+    # Obtener datos de velas de Bybit
+    url = f"https://api.bybit.com/v5/market/kline?category=linear&symbol={symbol}&interval={bybit_tf}&limit={limit}"
+    response = _bybit_session.get(url, timeout=10)
+    # Parsear los bytes crudos (sin pasar por response.text)
+    data = _json_loads(response.content)
+
+    if data.get('retCode') != 0 or not data.get('result', {}).get('list'):
+        raise ValueError(f"Error de Bybit: {data.get('retMsg', 'Sin datos')}")
+
+    # Convertir a formato esperado por calculate_zigzag (una sola comprensión,
+    # desempaquetando cada fila en vez de indexarla campo a campo)
+    candles = [
+        {
+            'time': int(ts[:-3]),  # ms -> s recortando los 3 últimos dígitos (Bybit envía ms como texto)
+            'open': float(o),
+            'high': float(h),
+            'low': float(l),
+            'close': float(c)
+        }
+        for ts, o, h, l, c, *_ in reversed(data['result']['list'])
+    ]
+
+    # Mismas velas que la última vez (p. ej. 1h/4h dentro de la misma barra): reutilizar el resultado
+    last = candles[-1]
+    result_key = (symbol, timeframe, limit, len(candles), last['time'], last['high'], last['low'])
+    with _candle_cache_lock:
+        payload = _zigzag_result_cache.get(result_key)
+        if payload is not None:
+            _zigzag_result_cache.move_to_end(result_key)
+            return payload
+
+    # Calcular ZigZag usando la misma lógica que el bot
+    zigzag_points = calculate_zigzag(candles, timeframe)
+
+    # Los ZigZagPoint (dataclass) se serializan directamente: {index, time, price, type}
+    result = {
+        'symbol': symbol,
+        'timeframe': timeframe,
+        'candles_count': len(candles),
+        'points': zigzag_points
+    }
+    payload = _json_dumps_bytes(result)
+    with _candle_cache_lock:
+        _zigzag_result_cache[result_key] = payload
+        if len(_zigzag_result_cache) > _ZIGZAG_RESULT_CACHE_MAX:
+            _zigzag_result_cache.popitem(last=False)
+    return payload
+
+
+def _fetch_zigzag(symbol: str, timeframe: str, limit: int):
+    """
+    (payload, payload_gzip) para la consulta: del cache si está fresco; si no, se calcula.
+    Si varias peticiones piden lo mismo a la vez, solo la primera va a Bybit y el resto la espera.
+    """
+    key = (symbol, timeframe, limit)
+    cached = _get_cached_zigzag(key)
+    if cached is not None:
+        return cached
+
+    with _candle_cache_lock:
+        event = _zigzag_inflight.get(key)
+        owner = event is None
+        if owner:
+            event = _zigzag_inflight[key] = threading.Event()
+
+    if not owner:
+        event.wait(15)
+        cached = _get_cached_zigzag(key)
+        if cached is not None:
+            return cached
+        # La petición original falló: intentarlo por cuenta propia
+        payload = _build_zigzag_payload(symbol, timeframe, limit)
+        return payload, _store_zigzag(key, payload)
+
+    try:
+        payload = _build_zigzag_payload(symbol, timeframe, limit)
+        return payload, _store_zigzag(key, payload)
+    finally:
+        with _candle_cache_lock:
+            _zigzag_inflight.pop(key, None)
+        event.set()
+
+
+# JSON comprimidos: {(path, encoding): ((mtime_ns, size), bytes)} - solo se recomprime si cambia el archivo
+_compressed_cache = {}
+
+# JSON sin comprimir: {path: ((mtime_ns, size), bytes)} - solo se relee del disco si cambia el archivo
+_file_cache = {}
+
+
+def _read_json(file_path, st) -> bytes:
+    """Contenido del archivo tal cual está en disco, cacheado por mtime/tamaño"""
+    key = (st.st_mtime_ns, st.st_size)
+    cached = _file_cache.get(file_path)
+    if cached and cached[0] == key:
+        return cached[1]
+    body = file_path.read_bytes()
+    _file_cache[file_path] = (key, body)
+    return body
+
+
+def _compress_json(file_path, st, encoding: str) -> bytes:
+    """Contenido del archivo comprimido con `encoding` ('br' o 'gzip'), cacheado por mtime/tamaño"""
+    key = (st.st_mtime_ns, st.st_size)
+    cached = _compressed_cache.get((file_path, encoding))
+    if cached and cached[0] == key:
+        return cached[1]
+    raw = _read_json(file_path, st)
+    body = brotli.compress(raw, quality=4) if encoding == 'br' else gzip.compress(raw, compresslevel=3)
+    _compressed_cache[(file_path, encoding)] = (key, body)
+    return body
+
+def _etag_matches(if_none_match, etag: str) -> bool:
+    """If-None-Match puede traer '*' o una lista separada por comas (comparación débil)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    tag = etag[2:]
+    return any(t.strip().removeprefix('W/') == tag for t in if_none_match.split(','))
 
 class CustomHandler(http.server.SimpleHTTPRequestHandler):
     """Handler personalizado que sirve archivos desde el directorio del bot"""
     
+    # Keep-alive: los dashboards que hacen polling reutilizan la conexión
+    # (toda respuesta con cuerpo debe llevar Content-Length)
+    protocol_version = "HTTP/1.1"
+    
     def __init__(self, *args, **kwargs):
         super().__init__(*args, directory=str(DIRECTORY), **kwargs)
     
     def do_GET(self):
         """Manejar peticiones GET con headers CORS y sin cache para JSON"""
+        # API endpoint para ZigZag: query parseada a mano (symbol/timeframe/limit, sin listas)
+        api_path, _, query = self.path.partition('?')
+        if api_path == '/api/zigzag':
+            params = dict(kv.partition('=')[::2] for kv in query.split('&') if kv)
+            return self._handle_zigzag_api(params)
+        
         parsed = urlparse(self.path)
         path = parsed.path
         
-        # Redirigir raíz a analisis_bot_v3.html
+        # Raíz: analisis_bot_v3.html servido desde memoria
         if path == '/' or path == '':
-            self.path = '/analisis_bot_v3.html'
-            return super().do_GET()
+            index = _get_index_page()
+            if index is None:
+                self.path = '/' + INDEX_FILE
+                return super().do_GET()
+            return self._send_index(*index)
         
-        # API endpoint para ZigZag
-        if path == '/api/zigzag':
-            return self._handle_zigzag_api(parse_qs(parsed.query))
-        
-        # Headers para permitir CORS y evitar cache en JSON
+        # JSON: CORS + revalidación con ETag (el navegador recibe 304 si el archivo no cambió)
         if path.endswith('.json'):
+            # Solo JSON del directorio del bot (sin subcarpetas ni '..')
+            name = path[1:]
+            if not name or '/' in name or '\\' in name:
+                self.send_error(404)
+                return
+            file_path = _get_json_path(name)
+            st = None
+            if file_path is not None:
+                try:
+                    st = file_path.stat()
+                except FileNotFoundError:
+                    pass
+            # ETag débil: el mismo valor vale para las variantes identity/gzip/br del archivo
+            etag = f'W/"{st.st_mtime_ns:x}-{st.st_size:x}"' if st else None
+            
+            if etag and _etag_matches(self.headers.get('If-None-Match'), etag):
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Access-Control-Allow-Origin', '*')
+                self.send_header('Cache-Control', 'no-cache')
+                self.end_headers()
+                return
+            
+            # Comprimir si el cliente lo acepta (br > gzip)
+            encoding = None
+            if st:
+                accept = self.headers.get('Accept-Encoding', '')
+                if brotli is not None and 'br' in accept:
+                    encoding = 'br'
+                elif 'gzip' in accept:
+                    encoding = 'gzip'
+            
+            try:
+                if encoding:
+                    body = _compress_json(file_path, st, encoding)
+                else:
+                    # Archivo tal cual está en disco (ya es UTF-8, sin decodificar/recodificar)
+                    body = _read_json(file_path, st) if st else b'{}'
+            except FileNotFoundError:
+                body, encoding, etag = b'{}', None, None
+            
             self.send_response(200)
             self.send_header('Content-type', 'application/json')
             self.send_header('Access-Control-Allow-Origin', '*')
-            self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
-            self.send_header('Pragma', 'no-cache')
-            self.send_header('Expires', '0')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Vary', 'Accept-Encoding')
+            if encoding:
+                self.send_header('Content-Encoding', encoding)
+            if etag:
+                self.send_header('ETag', etag)
+            self.send_header('Content-Length', str(len(body)))
             self.end_headers()
-            
-            # Leer y enviar archivo JSON
-            file_path = DIRECTORY / path.lstrip('/')
-            if file_path.exists():
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    self.wfile.write(f.read().encode('utf-8'))
-            else:
-                self.wfile.write(b'{}')
+            self.wfile.write(body)
             return
         
         # Para otros archivos, usar handler normal
@@ -68,69 +364,64 @@ class CustomHandler(http.server.SimpleHTTPRequestHandler):
     def _handle_zigzag_api(self, params):
         """Calcular ZigZag usando fibonacci.py y devolver JSON"""
         try:
-            symbol = params.get('symbol', ['BTCUSDT'])[0]
-            timeframe = params.get('timeframe', ['1h'])[0]
-            limit = int(params.get('limit', ['200'])[0])
-            
-            # Convertir timeframe al formato de Bybit
-            tf_map = {'1': '1', '5': '5', '15': '15', '60': '60', '240': '240',
-                      '1m': '1', '5m': '5', '15m': '15', '1h': '60', '4h': '240'}
-            bybit_tf = tf_map.get(timeframe, '60')
-            
-            # Obtener datos de velas de Bybit
-            url = f"https://api.bybit.com/v5/market/kline?category=linear&symbol={symbol}&interval={bybit_tf}&limit={limit}"
-            response = requests.get(url, timeout=10)
-            data = response.json()
-            
-            if data.get('retCode') != 0 or not data.get('result', {}).get('list'):
-                raise ValueError(f"Error de Bybit: {data.get('retMsg', 'Sin datos')}")
-            
-            # Convertir a formato esperado por calculate_zigzag
-            candles = []
-            for c in reversed(data['result']['list']):
-                candles.append({
-                    'time': int(c[0]) // 1000,  # Convertir ms a segundos
-                    'open': float(c[1]),
-                    'high': float(c[2]),
-                    'low': float(c[3]),
-                    'close': float(c[4])
-                })
+            symbol = unquote_plus(params.get('symbol') or 'BTCUSDT')
+            timeframe = unquote_plus(params.get('timeframe') or '1h')
+            limit = int(params.get('limit') or '200')
             
-            # Calcular ZigZag usando la misma lógica que el bot
-            zigzag_points = calculate_zigzag(candles, timeframe)
-            
-            # Convertir ZigZagPoint a dict para JSON
-            result = {
-                'symbol': symbol,
-                'timeframe': timeframe,
-                'candles_count': len(candles),
-                'points': [
-                    {
-                        'index': p.index,
-                        'time': p.time,
-                        'price': p.price,
-                        'type': p.type
-                    }
-                    for p in zigzag_points
-                ]
-            }
-            
-            # Enviar respuesta JSON
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.send_header('Cache-Control', 'no-cache')
-            self.end_headers()
-            self.wfile.write(json.dumps(result).encode('utf-8'))
+            # Cache de 60s; peticiones simultáneas de la misma consulta comparten una sola descarga
+            self._send_json_payload(*_fetch_zigzag(symbol, timeframe, limit))
             
         except Exception as e:
             # Error response
+            error_response = {'error': str(e)}
+            payload = _json_dumps_bytes(error_response)
             self.send_response(500)
             self.send_header('Content-type', 'application/json')
             self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Content-Length', str(len(payload)))
             self.end_headers()
-            error_response = {'error': str(e)}
-            self.wfile.write(json.dumps(error_response).encode('utf-8'))
+            self.wfile.write(payload)
+    
+    def _send_index(self, body: bytes, mtime: float):
+        """Enviar la página principal (304 si el navegador ya tiene esta versión)"""
+        ims = self.headers.get('If-Modified-Since')
+        if ims:
+            try:
+                if int(mtime) <= email.utils.parsedate_to_datetime(ims).timestamp():
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+            except (TypeError, ValueError, IndexError, OverflowError):
+                pass
+        self.send_response(200)
+        self.send_header('Content-type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Last-Modified', self.date_time_string(mtime))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def copyfile(self, source, outputfile):
+        """Archivos estáticos: sendfile(2) del kernel (socket.sendfile hace fallback a send si no existe)"""
+        try:
+            self.connection.sendfile(source)
+        except (AttributeError, OSError, ValueError):
+            shutil.copyfileobj(source, outputfile, 65536)
+    
+    def _send_json_payload(self, payload: bytes, payload_gzip: bytes = None):
+        """Enviar una respuesta JSON 200 ya serializada (la versión gzip si el cliente la acepta)"""
+        gzipped = payload_gzip is not None and 'gzip' in self.headers.get('Accept-Encoding', '')
+        if gzipped:
+            payload = payload_gzip
+        # Línea de estado + cabeceras + cuerpo en un único write (un solo send al socket)
+        self.log_request(200)
+        head = b"%s 200 OK\r\nDate: %s\r\n%s%sContent-Length: %d\r\n\r\n" % (
+            self.protocol_version.encode('latin-1'),
+            self.date_time_string().encode('latin-1'),
+            _ZIGZAG_HEADER_BLOCK,
+            b"Content-Encoding: gzip\r\n" if gzipped else b"",
+            len(payload),
+        )
+        self.wfile.write(head + payload)
     
     def log_message(self, format, *args):
         """Suprimir logs para reducir ruido"""
@@ -144,6 +435,8 @@ class WebServer:
         self.server = None
         self.thread = None
         self.running = False
+        self._warm_thread = None
+        self._stop_event = threading.Event()
     
     def start(self):
         """Iniciar servidor en hilo separado"""
@@ -152,11 +445,16 @@ class WebServer:
             return
         
         try:
-            self.server = socketserver.TCPServer(("", self.port), CustomHandler)
-            self.server.allow_reuse_address = True
+            # Un hilo por conexión: varias pestañas/dashboards no se bloquean entre sí
+            # (ThreadingHTTPServer ya activa allow_reuse_address y usa hilos daemon)
+            self.server = http.server.ThreadingHTTPServer(("", self.port), CustomHandler)
             self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
             self.thread.start()
             self.running = True
+            if WARM_LIST:
+                self._stop_event.clear()
+                self._warm_thread = threading.Thread(target=self._warmer, daemon=True)
+                self._warm_thread.start()
             print(f"🌐 Servidor web iniciado en http://localhost:{self.port}")
             print(f"📊 Análisis Antiguo: http://localhost:{self.port}/analisis_bot_v3.html")
             print(f"🚀 Dashboard Pro:    http://localhost:{self.port}/dashboard_pro.html")
@@ -166,31 +464,57 @@ class WebServer:
     
     def stop(self):
         """Detener servidor"""
+        self._stop_event.set()
         if self.server:
             self.server.shutdown()
             self.running = False
             print("🛑 Servidor web detenido")
     
+    def _warmer(self):
+        """Recalcular el ZigZag de WARM_LIST en cada cierre de vela de su timeframe"""
+        intervals = {tf: int(_TF_MAP.get(tf, '60')) * 60 for _, tf in WARM_LIST}
+        last_boundary = {}
+        while True:
+            now = time.time()
+            for symbol, tf in WARM_LIST:
+                boundary = (now - WARM_DELAY) // intervals[tf]
+                if last_boundary.get((symbol, tf)) == boundary:
+                    continue
+                last_boundary[(symbol, tf)] = boundary
+                try:
+                    payload = _build_zigzag_payload(symbol, tf, WARM_LIMIT)
+                    _store_zigzag((symbol, tf, WARM_LIMIT), payload)
+                except Exception as e:
+                    print(f"⚠️ Error precargando ZigZag {symbol} {tf}: {e}")
+            
+            # Dormir hasta el próximo cierre de vela (+WARM_DELAY) de cualquier timeframe de la lista
+            now = time.time()
+            wake = min((now - WARM_DELAY) // iv * iv + iv for iv in intervals.values()) + WARM_DELAY
+            if self._stop_event.wait(max(wake - now, 0.5)):
+                return
+    
     def get_local_url(self):
         """Obtener URL local"""
         return f"http://localhost:{self.port}/analisis_bot_v3.html"
 
-# Instancia global del servidor
+# Instancia global del servidor (bot.py la arranca desde otro hilo: crear/parar bajo lock)
 _web_server = None
+_web_server_lock = threading.Lock()
 
 def start_web_server(port=PORT):
     """Iniciar servidor web (función helper)"""
     global _web_server
-    if _web_server is None:
-        _web_server = WebServer(port)
-    _web_server.start()
-    return _web_server
+    with _web_server_lock:
+        if _web_server is None:
+            _web_server = WebServer(port)
+        _web_server.start()
+        return _web_server
 
 def stop_web_server():
     """Detener servidor web"""
-    global _web_server
-    if _web_server:
-        _web_server.stop()
+    with _web_server_lock:
+        if _web_server:
+            _web_server.stop()
 
 def get_web_server():
     """Obtener instancia del servidor"""
@@ -210,9 +534,13 @@ if __name__ == "__main__":
     print("\n💡 Para acceso remoto, ejecuta ngrok:")
     print("   ngrok http 8080")
     
+    # Dormir el hilo principal hasta Ctrl+C sin despertar cada segundo.
+    # En Windows una espera sin timeout no se interrumpe con Ctrl+C, así que allí se despierta cada 1s
+    stop_event = threading.Event()
+    wait_timeout = 1 if os.name == 'nt' else None
     try:
-        while True:
-            time.sleep(1)
+        while not stop_event.wait(wait_timeout):
+            pass
     except KeyboardInterrupt:
         print("\n👋 Deteniendo servidor...")
         stop_web_server()